@@ -0,0 +1,74 @@
+"""
+Сравнение рассылки через send_json на каждый сокет и рассылки одного
+заранее сериализованного кадра (encode_frame + send_text).
+
+Запуск: python -m benchmarks.broadcast_benchmark
+"""
+import asyncio
+import json
+import time
+
+from presentation.websockets.WebSocketRouter import encode_frame
+
+
+class FakeWebSocket:
+    """Повторяет send_json/send_text из starlette без реальной сети"""
+
+    def __init__(self):
+        self.sent_bytes = 0
+
+    async def send(self, message: dict):
+        self.sent_bytes += len(message["text"])
+
+    async def send_text(self, data: str):
+        await self.send({"type": "websocket.send", "text": data})
+
+    async def send_json(self, data: dict):
+        text = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+        await self.send({"type": "websocket.send", "text": text})
+
+
+def build_rating_message(players_count: int = 150) -> dict:
+    return {
+        "type": "rating",
+        "content": [
+            {"id": i, "username": f"Команда {i}", "score": players_count - i}
+            for i in range(players_count)
+        ],
+        "section": "Коренной перелом в ходе Великой Отечественной войны"
+    }
+
+
+async def broadcast_send_json(sockets: list, message: dict):
+    await asyncio.gather(*(ws.send_json(message) for ws in sockets))
+
+
+async def broadcast_encoded(sockets: list, message: dict):
+    frame = encode_frame(message)
+    await asyncio.gather(*(ws.send_text(frame) for ws in sockets))
+
+
+async def measure(broadcast, sockets: list, message: dict, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        await broadcast(sockets, message)
+    return (time.perf_counter() - start) / repeats
+
+
+async def main():
+    message = build_rating_message()
+    print(f"Размер кадра: {len(encode_frame(message).encode())} байт")
+    print(f"{'сокетов':>8} | {'send_json, мс':>14} | {'encode once, мс':>16} | {'ускорение':>9}")
+
+    for sockets_count, repeats in ((100, 50), (1_000, 10), (10_000, 3)):
+        sockets = [FakeWebSocket() for _ in range(sockets_count)]
+        per_socket = await measure(broadcast_send_json, sockets, message, repeats)
+        encoded_once = await measure(broadcast_encoded, sockets, message, repeats)
+        print(
+            f"{sockets_count:>8} | {per_socket * 1000:>14.2f} | "
+            f"{encoded_once * 1000:>16.2f} | {per_socket / encoded_once:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
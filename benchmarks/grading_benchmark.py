@@ -0,0 +1,54 @@
+"""
+Время автоматической проверки ответов на один вопрос (AnswerGrader.grade).
+
+Запуск: python -m benchmarks.grading_benchmark
+"""
+import random
+import time
+
+from services.answers.AnswerGrader import AnswerGrader
+
+REFERENCE = "Сталинградская битва / Битва под Сталинградом"
+TYPICAL_ANSWERS = (
+    "Сталинградская битва", "сталинградская битва!", "Сталингратская битва", "битва за Сталинград",
+    "Курская битва", "Сталинград", "не знаю", "Битва под Москвой", "Сталинградская битва 1942 года",
+    "операция Уран", "Оборона Севастополя", "СТАЛИНГРАДСКАЯ БИТВА", "сталинградскаябитва"
+)
+ALPHABET = "абвгдеёжзийклмнопрстуфхцчшщэюя "
+
+
+def typical_answers(count: int, rnd: random.Random) -> list[tuple[str, str]]:
+    return [(f"Команда {i}", rnd.choice(TYPICAL_ANSWERS)) for i in range(count)]
+
+
+def unique_answers(count: int, rnd: random.Random) -> list[tuple[str, str]]:
+    """Худший случай: ни один ответ не повторяется"""
+    return [
+        (f"Команда {i}", "".join(rnd.choice(ALPHABET) for _ in range(rnd.randint(5, 40))))
+        for i in range(count)
+    ]
+
+
+def measure(grader: AnswerGrader, answers: list[tuple[str, str]], repeats: int) -> tuple[float, float]:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        grader.grade(REFERENCE, answers)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], timings[-1]
+
+
+def main():
+    rnd = random.Random(42)
+    grader = AnswerGrader()
+    print(f"{'ответов':>8} | {'набор':>10} | {'медиана, мс':>12} | {'максимум, мс':>13}")
+
+    for answers_count in (100, 500, 1_000):
+        for name, answers in (("типичный", typical_answers(answers_count, rnd)), ("уникальный", unique_answers(answers_count, rnd))):
+            median, worst = measure(grader, answers, repeats=20)
+            print(f"{answers_count:>8} | {name:>10} | {median:>12.2f} | {worst:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 __all__ = (
     "settings",
-    "DatabaseConnection"
+    "DatabaseConnection",
+    "RedisConnection"
 )
 
 from .settings import settings
 from .database import DatabaseConnection
-
+from .redis_connection import RedisConnection
@@ -3,12 +3,26 @@ from typing import AsyncGenerator
 
 
 class DatabaseConnection():
-    def __init__(self, db_url: str, db_echo: bool, echo_pool: bool, pool_size: int):
+    def __init__(
+        self,
+        db_url: str,
+        db_echo: bool,
+        echo_pool: bool,
+        pool_size: int,
+        max_overflow: int = 0,
+        pool_timeout: float = 30,
+        pool_recycle: int = -1,
+        pool_pre_ping: bool = False
+    ):
         self.engine = create_async_engine(
             url=db_url,
             echo=db_echo,
             echo_pool=echo_pool,
-            pool_size=pool_size
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping
         )
         self.session_factory: AsyncGenerator[AsyncSession, None] = async_sessionmaker(
             bind=self.engine,
@@ -18,4 +32,17 @@ class DatabaseConnection():
         )
     async def sesion_creation(self):
         async with self.session_factory() as session:
-            yield session
\ No newline at end of file
+            yield session
+
+    async def dispose(self):
+        await self.engine.dispose()
+
+    def pool_stats(self) -> dict:
+        """Состояние пула соединений: занято, в переполнении, свободно"""
+        pool = self.engine.pool
+        return {
+            "size": pool.size() if hasattr(pool, "size") else 0,
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else 0,
+            "overflow": max(pool.overflow(), 0) if hasattr(pool, "overflow") else 0,
+            "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else 0
+        }
@@ -46,12 +46,21 @@ async def start_monitoring_task():
     while True:
         try:
             stats = await get_system_stats()
-            from presentation.websockets.WebSocketRouter import active_players, active_spectators
+            from presentation.websockets.ConnectionHub import hub, PLAYER, SPECTATOR
+            from presentation.websockets.BroadcastBus import bus
+            from services.answers.AnswerBatcher import answer_batcher
+            from dependencies import get_db, get_redis_connection
             
-            # Проверяем, что переменные существуют и инициализированы
-            player_count = len(active_players) if active_players is not None else 0
-            spectator_count = len(active_spectators) if active_spectators is not None else 0
+            hub_stats = hub.stats()
+            answers_stats = answer_batcher.stats()
+            db_pool = get_db().pool_stats()
+            redis_pool = get_redis_connection().pool_stats()
+            player_count = hub_stats[PLAYER]['count']
+            spectator_count = hub_stats[SPECTATOR]['count']
             total_connections = player_count + spectator_count
+
+            # Суммарные счетчики по всем воркерам (если шина запущена)
+            presence = await bus.presence() if bus.started else {"workers": 1, "players": player_count, "spectators": spectator_count}
             
             logger.info(f"""
                         ============= СТАТИСТИКА СЕРВЕРА =============
@@ -59,6 +68,33 @@ async def start_monitoring_task():
 Активные зрители: {spectator_count}
 Всего WebSocket подключений: {total_connections}
 
+Очереди отправки:
+    ├── Кадров в очередях игроков: {hub_stats[PLAYER]['queued_frames']} (макс. {hub_stats[PLAYER]['max_queue_depth']})
+    ├── Кадров в очередях зрителей: {hub_stats[SPECTATOR]['queued_frames']} (макс. {hub_stats[SPECTATOR]['max_queue_depth']})
+    └── Отправлено байт: {hub_stats[PLAYER]['bytes_sent'] + hub_stats[SPECTATOR]['bytes_sent']}
+
+Запись ответов:
+    ├── В очереди: {answers_stats['queue_depth']}
+    ├── Записано: {answers_stats['flushed']} за {answers_stats['batches']} пачек
+    ├── Ошибки записи: {answers_stats['failed']}
+    └── Время записи пачки: последняя {answers_stats['last_flush_ms']} мс, средняя {answers_stats['avg_flush_ms']} мс, макс. {answers_stats['max_flush_ms']} мс
+
+Пул соединений с БД:
+    ├── Размер пула: {db_pool['size']}
+    ├── Занято: {db_pool['checked_out']}
+    ├── В переполнении: {db_pool['overflow']}
+    └── Свободно: {db_pool['checked_in']}
+
+Пул соединений с Redis:
+    ├── Занято: {redis_pool['in_use']} из {redis_pool['max_connections']}
+    ├── Ожидают соединение: {redis_pool['waiting']}
+    ├── Свободно: {redis_pool['idle']}
+    └── Создано всего: {redis_pool['created']}
+
+Все воркеры ({presence['workers']}):
+    ├── Игроки: {presence['players']}
+    └── Зрители: {presence['spectators']}
+
 Системные ресурсы:
     ├── Загрузка ЦП: {stats['cpu_percent']}%
     ├── Использование памяти: {stats['memory_percent']}%
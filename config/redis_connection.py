@@ -0,0 +1,56 @@
+from redis.asyncio import BlockingConnectionPool, Redis
+
+
+class RedisConnectionPool(BlockingConnectionPool):
+    """Блокирующий пул, который считает созданные соединения и задачи в ожидании"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self.created = 0
+
+    def make_connection(self):
+        self.created += 1
+        return super().make_connection()
+
+    async def get_connection(self, command_name, *keys, **options):
+        self.waiting += 1
+        try:
+            return await super().get_connection(command_name, *keys, **options)
+        finally:
+            self.waiting -= 1
+
+
+class RedisConnection():
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        max_connections: int,
+        pool_timeout: float,
+        health_check_interval: int,
+        db: int = 0
+    ):
+        self.pool = RedisConnectionPool(
+            host=host,
+            port=port,
+            db=db,
+            max_connections=max_connections,
+            timeout=pool_timeout,
+            health_check_interval=health_check_interval
+        )
+        self.client = Redis(connection_pool=self.pool)
+
+    async def close(self):
+        await self.client.aclose()
+        await self.pool.disconnect()
+
+    def pool_stats(self) -> dict:
+        """Состояние пула Redis: занято, ожидают, создано за все время"""
+        return {
+            "max_connections": self.pool.max_connections,
+            "in_use": len(self.pool._in_use_connections),
+            "idle": len(self.pool._available_connections),
+            "waiting": self.pool.waiting,
+            "created": self.pool.created
+        }
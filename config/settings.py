@@ -13,12 +13,26 @@ CORS_ORIGIN: str = os.environ.get("CORS_ORIGIN")
 
 TEST_DB_URL: str = os.environ.get("TEST_DB_URL")
 
+DB_POOL_SIZE: int = int(os.environ.get("DB_POOL_SIZE", 20))
+DB_MAX_OVERFLOW: int = int(os.environ.get("DB_MAX_OVERFLOW", 30))
+DB_POOL_TIMEOUT: float = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE: int = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING: bool = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+
 PORT: int = os.environ.get("PORT")
 
 JWT_SECRET: str = os.environ.get("JWT_SECRET")
 
 REDIS_URL: str = os.environ.get("REDIS_URL")
 REDIS_PORT: int = os.environ.get("REDIS_PORT")
+REDIS_MAX_CONNECTIONS: int = int(os.environ.get("REDIS_MAX_CONNECTIONS", 100))
+REDIS_POOL_TIMEOUT: float = float(os.environ.get("REDIS_POOL_TIMEOUT", 5))
+REDIS_HEALTH_CHECK_INTERVAL: int = int(os.environ.get("REDIS_HEALTH_CHECK_INTERVAL", 30))
+REDIS_NAMESPACE: str = os.environ.get("REDIS_NAMESPACE", "vikt:game")
+
+TIMER_DURATION: int = int(os.environ.get("TIMER_DURATION", 40))
+SPEED_BONUS_POINTS: int = int(os.environ.get("SPEED_BONUS_POINTS", 2))
+SPEED_BONUS_WINDOW: int = int(os.environ.get("SPEED_BONUS_WINDOW", TIMER_DURATION))
 
 
 class RunConfig(BaseModel):
@@ -35,7 +49,11 @@ class DBConfig(BaseModel):
     url: str = DB_URL
     echo: bool = True
     echo_pool: bool = True
-    pool_size: int = 500
+    pool_size: int = DB_POOL_SIZE
+    max_overflow: int = DB_MAX_OVERFLOW
+    pool_timeout: float = DB_POOL_TIMEOUT
+    pool_recycle: int = DB_POOL_RECYCLE
+    pool_pre_ping: bool = DB_POOL_PRE_PING
     test_url: str = TEST_DB_URL
 
 class JWTConfig(BaseModel):
@@ -47,6 +65,16 @@ class JWTConfig(BaseModel):
 class RedisConfig(BaseModel):
     url: str = REDIS_URL
     port: int = REDIS_PORT
+    max_connections: int = REDIS_MAX_CONNECTIONS
+    pool_timeout: float = REDIS_POOL_TIMEOUT
+    health_check_interval: int = REDIS_HEALTH_CHECK_INTERVAL
+    namespace: str = REDIS_NAMESPACE
+
+
+class GameConfig(BaseModel):
+    timer_duration: int = TIMER_DURATION
+    speed_bonus_points: int = SPEED_BONUS_POINTS
+    speed_bonus_window: int = SPEED_BONUS_WINDOW
 
 
 #----------------------------------------------------------------
@@ -56,6 +84,7 @@ class Settings(BaseSettings):
     cors: CORSConfig = CORSConfig()
     redis: RedisConfig = RedisConfig()
     run: RunConfig = RunConfig()
+    game: GameConfig = GameConfig()
     
     
     
@@ -1,40 +1,88 @@
 from fastapi import Depends
-from repositories import UserRepository, QuestionRepository, AnswerRepository, GameRepository
+from repositories import UserRepository, QuestionRepository, AnswerRepository, GameRepository, UnitOfWork
 from services import UserService, QuestionService, AnswerService, GameService
-from config import DatabaseConnection, settings
-from sqlalchemy.ext.asyncio import AsyncSession
+from config import DatabaseConnection, RedisConnection, settings
 
 from redis.asyncio import Redis
 
+database: DatabaseConnection | None = None
+
+def init_db() -> DatabaseConnection:
+    """Создает единственный на процесс движок БД, вызывается из lifespan"""
+    global database
+    if database is None:
+        database = DatabaseConnection(
+            db_url=settings.db.test_url,
+            echo_pool=settings.db.echo_pool,
+            pool_size=settings.db.pool_size,
+            max_overflow=settings.db.max_overflow,
+            pool_timeout=settings.db.pool_timeout,
+            pool_recycle=settings.db.pool_recycle,
+            pool_pre_ping=settings.db.pool_pre_ping,
+            db_echo=settings.db.echo
+        )
+    return database
+
+async def close_db():
+    global database
+    if database is not None:
+        await database.dispose()
+        database = None
+
 def get_db() -> DatabaseConnection:
-    return DatabaseConnection(
-        db_url=settings.db.test_url,
-        echo_pool=settings.db.echo_pool,
-        pool_size=settings.db.pool_size,
-        db_echo=settings.db.echo
-    )
+    if database is None:
+        raise RuntimeError("Движок БД не создан: init_db() вызывается при старте приложения")
+    return database
     
-async def get_redis():
-    redis = Redis(
-        host=settings.redis.url, 
-        port=settings.redis.port, 
-        db=0)
-    try:
-        yield redis
-    finally:
-        await redis.close()
-    
-def get_user_repository(session: AsyncSession = Depends(get_db().sesion_creation)) -> UserRepository:
-    return UserRepository(session=session)
+redis_connection: RedisConnection | None = None
+
+def init_redis() -> RedisConnection:
+    """Создает общий на процесс пул соединений с Redis, вызывается из lifespan"""
+    global redis_connection
+    if redis_connection is None:
+        redis_connection = RedisConnection(
+            host=settings.redis.url,
+            port=settings.redis.port,
+            max_connections=settings.redis.max_connections,
+            pool_timeout=settings.redis.pool_timeout,
+            health_check_interval=settings.redis.health_check_interval
+        )
+    return redis_connection
+
+async def close_redis():
+    global redis_connection
+    if redis_connection is not None:
+        await redis_connection.close()
+        redis_connection = None
+
+def get_redis_connection() -> RedisConnection:
+    if redis_connection is None:
+        raise RuntimeError("Пул Redis не создан: init_redis() вызывается при старте приложения")
+    return redis_connection
+
+def get_redis() -> Redis:
+    return get_redis_connection().client
+
+def create_unit_of_work(redis: Redis | None = None) -> UnitOfWork:
+    """UnitOfWork вне HTTP-запроса: фоновые задачи, WebSocket"""
+    return UnitOfWork(session_factory=get_db().session_factory, redis=redis)
+
+async def get_unit_of_work(redis: Redis = Depends(get_redis)):
+    """Одна сессия на запрос для всех репозиториев, коммит один раз в конце"""
+    async with create_unit_of_work(redis=redis) as uow:
+        yield uow
+
+def get_user_repository(uow: UnitOfWork = Depends(get_unit_of_work)) -> UserRepository:
+    return uow.users
 
-def get_question_repository(session: AsyncSession = Depends(get_db().sesion_creation), redis: Redis = Depends(get_redis)) -> QuestionRepository:
-    return QuestionRepository(session=session, redis=redis)
+def get_question_repository(uow: UnitOfWork = Depends(get_unit_of_work)) -> QuestionRepository:
+    return uow.questions
 
-def get_answer_repository(session: AsyncSession = Depends(get_db().sesion_creation)) -> AnswerRepository:
-    return AnswerRepository(session=session)
+def get_answer_repository(uow: UnitOfWork = Depends(get_unit_of_work)) -> AnswerRepository:
+    return uow.answers
 
-def get_game_repository(session: AsyncSession = Depends(get_db().sesion_creation)) -> GameRepository:
-    return GameRepository(session=session)
+def get_game_repository(uow: UnitOfWork = Depends(get_unit_of_work)) -> GameRepository:
+    return uow.games
 
 #==================================================================
 
@@ -1,17 +1,64 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.openapi.docs import get_swagger_ui_html, get_redoc_html
 from fastapi.openapi.utils import get_openapi
 from presentation import router as ApiV2Router
+from presentation.websockets.BroadcastBus import bus
+from presentation.websockets.Heartbeat import heartbeat
+from presentation.websockets.WebSocketRouter import deliver_local, local_presence, apply_remote_state, handle_disconnect
+from services.answers.AnswerBatcher import answer_batcher
+from services.answers.AnswerGate import answer_gate
+from services.answers.AnswerClusters import answer_clusters
+from services.users.Leaderboard import leaderboard
+from services.games.GameState import game_state
+from services.games.GameTimer import game_timer
+from services.questions.QuestionPrefetcher import question_prefetcher
+from dependencies import init_db, close_db, init_redis, close_redis
+from config.logger import setup_logging
 import uvicorn
 
+logger = setup_logging()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    session_factory = init_db().session_factory
+    redis = init_redis().client
+    await game_state.start(session_factory=session_factory, redis=redis)
+    try:
+        await bus.start(redis=redis, deliver=deliver_local, local_presence=local_presence, on_state=apply_remote_state)
+        game_state.on_change = bus.publish_state
+        game_timer.on_change = bus.publish_state
+        leaderboard.on_change = bus.publish_state
+    except Exception as e:
+        logger.error(f"Шина Redis недоступна, рассылка только в пределах воркера: {str(e)}")
+    heartbeat.start(on_dead=handle_disconnect)
+    answer_batcher.start(session_factory=session_factory)
+    answer_gate.start(redis=redis)
+    answer_clusters.start(redis=redis)
+    leaderboard.start(redis=redis)
+    question_prefetcher.start(session_factory=session_factory, redis=redis)
+    yield
+    await heartbeat.stop()
+    await answer_batcher.stop()
+    await question_prefetcher.stop()
+    await game_timer.stop()
+    game_state.on_change = None
+    game_timer.on_change = None
+    leaderboard.on_change = None
+    await bus.stop()
+    await game_state.stop()
+    await close_redis()
+    await close_db()
+
 app = FastAPI(
     title="Vikt API",
     docs_url=None,
     redoc_url=None,
-    openapi_url="/api/openapi.json"
+    openapi_url="/api/openapi.json",
+    lifespan=lifespan
 )
 
 relative_path = "static/images/"
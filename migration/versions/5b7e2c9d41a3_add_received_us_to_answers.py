@@ -0,0 +1,26 @@
+"""Add received_us to answers
+
+Revision ID: 5b7e2c9d41a3
+Revises: 98ffa5089b68
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e2c9d41a3'
+down_revision: Union[str, None] = '98ffa5089b68'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('answers', sa.Column('received_us', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('answers', 'received_us')
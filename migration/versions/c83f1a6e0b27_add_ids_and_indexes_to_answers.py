@@ -0,0 +1,48 @@
+"""Add question_id, game_id, user_id, created_at and indexes to answers
+
+Revision ID: c83f1a6e0b27
+Revises: 5b7e2c9d41a3
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c83f1a6e0b27'
+down_revision: Union[str, None] = '5b7e2c9d41a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('answers', sa.Column('question_id', sa.Integer(), nullable=True))
+    op.add_column('answers', sa.Column('game_id', sa.Integer(), nullable=True))
+    op.add_column('answers', sa.Column('user_id', sa.Integer(), nullable=True))
+    op.add_column('answers', sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+
+    op.create_foreign_key('answers_question_id_fkey', 'answers', 'questions', ['question_id'], ['id'], ondelete='SET NULL')
+    op.create_foreign_key('answers_game_id_fkey', 'answers', 'gamestatus', ['game_id'], ['id'], ondelete='SET NULL')
+    op.create_foreign_key('answers_user_id_fkey', 'answers', 'users', ['user_id'], ['id'], ondelete='SET NULL')
+
+    # Старые ответы связываем с вопросами и пользователями по тексту и имени
+    op.execute("UPDATE answers SET question_id = questions.id FROM questions WHERE questions.question = answers.question")
+    op.execute("UPDATE answers SET user_id = users.id FROM users WHERE users.username = answers.username")
+
+    op.create_index('ix_answers_game_question', 'answers', ['game_id', 'question_id'], unique=False)
+    op.create_index('ix_answers_game_user', 'answers', ['game_id', 'user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_answers_game_user', table_name='answers')
+    op.drop_index('ix_answers_game_question', table_name='answers')
+    op.drop_constraint('answers_user_id_fkey', 'answers', type_='foreignkey')
+    op.drop_constraint('answers_game_id_fkey', 'answers', type_='foreignkey')
+    op.drop_constraint('answers_question_id_fkey', 'answers', type_='foreignkey')
+    op.drop_column('answers', 'created_at')
+    op.drop_column('answers', 'user_id')
+    op.drop_column('answers', 'game_id')
+    op.drop_column('answers', 'question_id')
@@ -1,14 +1,28 @@
+from datetime import datetime
+from typing import Optional
+
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Text
+from sqlalchemy import String, Text, BigInteger, Integer, DateTime, ForeignKey, Index, func
 from .base import Base
 
 
 
 class Answer(Base):
     __tablename__ = "answers"
+    __table_args__ = (
+        Index("ix_answers_game_question", "game_id", "question_id"),
+        Index("ix_answers_game_user", "game_id", "user_id"),
+    )
     
     question: Mapped[str] = mapped_column(Text, nullable=False, unique=False)
     username: Mapped[str] = mapped_column(String(255), nullable=True, unique=False)
     answer: Mapped[str] = mapped_column(Text, nullable=False, unique=False)
 
+    question_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("questions.id", ondelete="SET NULL"), nullable=True)
+    game_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("gamestatus.id", ondelete="SET NULL"), nullable=True)
+    user_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+
     answer_at: Mapped[str] = mapped_column(String(255), nullable=False, unique=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # Время получения ответа сервером в микросекундах от показа вопроса
+    received_us: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True, unique=False)
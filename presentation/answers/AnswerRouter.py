@@ -1,7 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from dependencies import get_answer_service, get_db
+import csv
+import io
+import json
+
+from typing import AsyncIterator, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from dependencies import get_answer_service, create_unit_of_work
+from repositories.answers.AnswerRepository import EXPORT_COLUMNS, ANSWERS_PAGE_SIZE
+from schemas.answers import AnswerFilterSchema, AnswerPageSchema
 from services.answers.AnswerService import AnswerService
+from services.games.GameState import game_state
 
 router = APIRouter(prefix="/answers", tags=["Answers"])
 
@@ -12,67 +21,115 @@ async def add_answer(
     question: str,
     username: str,
     answer: str = None,
-    service: AnswerService = Depends(get_answer_service),
-    db: AsyncSession = Depends(get_db)
+    question_id: int | None = None,
+    service: AnswerService = Depends(get_answer_service)
 ):
     try:
-        new_answer = await service.add_answer(question=question, username=username, answer=answer)
+        new_answer = await service.add_answer(
+            question=question,
+            username=username,
+            answer=answer,
+            question_id=question_id,
+            game_id=game_state.snapshot.id
+        )
         return new_answer
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/",
-            summary="Получение всех ответов",
-            description="Возвращает список всех ответов")
+            response_model=AnswerPageSchema,
+            summary="Получение ответов постранично",
+            description="Возвращает страницу ответов по фильтрам; следующая страница - с after=next_cursor")
 async def get_all_answers(
-    service: AnswerService = Depends(get_answer_service),
-    db: AsyncSession = Depends(get_db)
+    filters: AnswerFilterSchema = Depends(),
+    after: int | None = None,
+    limit: int = Query(default=ANSWERS_PAGE_SIZE, ge=1, le=1000),
+    service: AnswerService = Depends(get_answer_service)
+) -> AnswerPageSchema:
+    answers = await service.get_answers_page(filters=filters, after=after, limit=limit)
+    return AnswerPageSchema(items=answers, next_cursor=answers[-1].id if len(answers) == limit else None)
+
+def encode_export_value(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+async def export_answers(filters: AnswerFilterSchema, export_format: str) -> AsyncIterator[str]:
+    """Выгрузка пачками: в памяти одновременно только одна пачка строк"""
+    # Ответ отдается после выхода из обработчика, поэтому у выгрузки своя сессия
+    async with create_unit_of_work() as uow:
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            yield buffer.getvalue()
+
+        async for rows in AnswerService(repository=uow.answers).stream_answers(filters):
+            if export_format == "csv":
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows([encode_export_value(value) for value in row] for row in rows)
+                yield buffer.getvalue()
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False, default=encode_export_value) + "\n"
+                    for row in rows
+                )
+
+@router.get("/export",
+            summary="Выгрузка ответов",
+            description="Потоково выгружает ответы по фильтрам в NDJSON или CSV")
+async def export_all_answers(
+    filters: AnswerFilterSchema = Depends(),
+    format: Literal["ndjson", "csv"] = "ndjson"
 ):
-    try:
-        answers = await service.get_all_answers()
-        return answers
-    except Exception as e:
-        raise HTTPException(status_code=404, detail=str(e))
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_answers(filters, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=answers.{format}"}
+    )
 
-@router.get("/question/{question}",
+@router.get("/question/{question_id}",
             summary="Получение ответов по ID вопроса",
-            description="Возвращает список ответов на конкретный вопрос")
+            description="Возвращает список ответов на конкретный вопрос в игре (по умолчанию в текущей)")
 async def get_answers_by_question_id(
-    question: str,
-    service: AnswerService = Depends(get_answer_service),
-    db: AsyncSession = Depends(get_db)
+    question_id: int,
+    game_id: int | None = None,
+    service: AnswerService = Depends(get_answer_service)
 ):
     try:
-        answers = await service.get_answers_by_question_id(question=question)
+        answers = await service.get_answers_by_question_id(question_id=question_id, game_id=game_id or game_state.snapshot.id)
         return answers
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
 
-@router.get("/user/{username}",
+@router.get("/user/{user_id}",
             summary="Получение ответов по ID пользователя",
-            description="Возвращает список ответов конкретного пользователя")
+            description="Возвращает список ответов конкретного пользователя в игре (по умолчанию в текущей)")
 async def get_answers_by_user_id(
-    username: str,
-    service: AnswerService = Depends(get_answer_service),
-    db: AsyncSession = Depends(get_db)
+    user_id: int,
+    game_id: int | None = None,
+    service: AnswerService = Depends(get_answer_service)
 ):
     try:
-        answers = await service.get_answers_by_user_id(username=username)
+        answers = await service.get_answers_by_user_id(user_id=user_id, game_id=game_id or game_state.snapshot.id)
         return answers
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
 
-@router.get("/question/{question}/user/{username}",
+@router.get("/question/{question_id}/user/{user_id}",
             summary="Получение ответов по ID вопроса и ID пользователя",
-            description="Возвращает список ответов на конкретный вопрос от конкретного пользователя")
+            description="Возвращает список ответов на конкретный вопрос от конкретного пользователя в игре (по умолчанию в текущей)")
 async def get_answers_by_question_and_user(
-    question: str,
-    username: str,
-    service: AnswerService = Depends(get_answer_service),
-    db: AsyncSession = Depends(get_db)
+    question_id: int,
+    user_id: int,
+    game_id: int | None = None,
+    service: AnswerService = Depends(get_answer_service)
 ):
     try:
-        answers = await service.get_answers_by_question_and_user(question=question, username=username)
+        answers = await service.get_answers_by_question_and_user(
+            question_id=question_id,
+            user_id=user_id,
+            game_id=game_id or game_state.snapshot.id
+        )
         return answers
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
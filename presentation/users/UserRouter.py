@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import HTTPBearer, OAuth2PasswordBearer
 from services.users.UserService import UserService
-from schemas.users import UserLoginSchema, UserSchema, UserByName
-from dependencies import get_user_service
+from schemas.users import UserLoginSchema, UserSchema, UserByName, UserScoresSchema
+from dependencies import get_user_service, get_unit_of_work
+from repositories import UnitOfWork
+from services.users.Leaderboard import leaderboard
+from presentation.websockets.WebSocketRouter import broadcast_rating_update
 
 
 http_bearer = HTTPBearer(auto_error=False)
@@ -16,10 +19,13 @@ router = APIRouter(prefix="/users", tags=["User"], dependencies=[Depends(http_be
             description="Добавляет новго пользователя и возвращает сообщение об успешной регистрации")
 async def index(
     user_in: UserLoginSchema = Depends(UserLoginSchema),
-    service: UserService = Depends(get_user_service)
+    service: UserService = Depends(get_user_service),
+    uow: UnitOfWork = Depends(get_unit_of_work)
 ):
     try:
         user = await service.registration(user_in=user_in)
+        await uow.commit()
+        await leaderboard.invalidate()
         return {"message": "Пользователь успешно зарегистрирован", "user": user}
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -44,13 +50,34 @@ async def index(
 async def index(
     username: str,
     points: int,
-    service: UserService = Depends(get_user_service)
+    service: UserService = Depends(get_user_service),
+    uow: UnitOfWork = Depends(get_unit_of_work)
 ):
     try:
         user = await service.add_score_to_user(username=username, points=points)
+        await uow.commit()
+        await leaderboard.add_score(username, points)
+        await broadcast_rating_update(service)
         return user
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
+
+@router.post("/score/bulk",
+            summary="Начисление очков нескольким пользователям",
+            description="Применяет изменения очков {username: delta} одной транзакцией и один раз обновляет рейтинг")
+async def add_scores(
+    scores_in: UserScoresSchema,
+    service: UserService = Depends(get_user_service),
+    uow: UnitOfWork = Depends(get_unit_of_work)
+):
+    try:
+        users = await service.add_scores_to_users(scores=scores_in.scores)
+        await uow.commit()
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    await leaderboard.add_scores(scores_in.scores)
+    await broadcast_rating_update(service)
+    return users
     
 @router.get("/me", response_model=UserSchema)
 async def index(
@@ -93,10 +120,13 @@ async def index(
                 description="Удаляет пользователя по имени")
 async def index(
     username: str,
-    service: UserService = Depends(get_user_service)
+    service: UserService = Depends(get_user_service),
+    uow: UnitOfWork = Depends(get_unit_of_work)
 ) -> dict:
     try:
         user = await service.delete_user_by_username(username=username)
+        await uow.commit()
+        await leaderboard.invalidate()
         return user
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -105,10 +135,13 @@ async def index(
              summary="Обнуление таблицы users",
              description="Удаляет все данные из таблицы users и сбрасывает счетчик id")
 async def reset_users_table(
-    service: UserService = Depends(get_user_service)
+    service: UserService = Depends(get_user_service),
+    uow: UnitOfWork = Depends(get_unit_of_work)
 ) -> dict:
     try:
         result = await service.reset_users_table()
+        await uow.commit()
+        await leaderboard.invalidate()
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
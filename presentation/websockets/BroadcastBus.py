@@ -0,0 +1,205 @@
+import asyncio
+import json
+import os
+import socket
+
+from typing import Callable, Optional
+
+from redis.asyncio import Redis
+
+from config import settings
+from config.logger import setup_logging
+
+logger = setup_logging()
+
+BROADCAST_CHANNEL = "broadcast"
+STATE_CHANNEL = "state"
+PRESENCE_WORKERS_KEY = "presence:workers"
+PRESENCE_KEY = "presence:{worker_id}"
+PRESENCE_INTERVAL = 5
+PRESENCE_TTL = 30
+RESUBSCRIBE_MIN_DELAY = 0.5
+RESUBSCRIBE_MAX_DELAY = 10
+
+ROLES_SEPARATOR = ","
+HEADER_SEPARATOR = "|"
+
+
+class BroadcastBus:
+    """
+    Шина рассылки между воркерами через Redis pub/sub.
+
+    Каждый воркер подписан на канал игры и раздает полученные кадры своим
+    локальным подключениям. Кадр публикуется уже сериализованным, с коротким
+    заголовком "тип|роли|", поэтому воркеры не разбирают JSON повторно.
+    Заодно воркер периодически пишет в Redis число своих игроков и зрителей,
+    чтобы счетчики присутствия можно было сложить по всем процессам.
+    По отдельному каналу воркеры обмениваются изменениями состояния игры.
+    Каналы и ключи присутствия лежат под префиксом игры, как и остальные
+    ее ключи, поэтому игры на общем Redis не слышат друг друга.
+
+    При обрыве соединения с Redis слушатель переподписывается с растущей
+    паузой, а пока подписки нет, started возвращает False и кадры
+    раздаются только локальным подключениям.
+    """
+
+    def __init__(self, namespace: str = settings.redis.namespace):
+        self.prefix = f"{namespace}:"
+        self.channel = self.prefix + BROADCAST_CHANNEL
+        self.state_channel = self.prefix + STATE_CHANNEL
+        self.workers_key = self.prefix + PRESENCE_WORKERS_KEY
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.redis: Optional[Redis] = None
+        self.deliver: Optional[Callable[[str, list[str], str], None]] = None
+        self.local_presence: Optional[Callable[[], dict]] = None
+        self.on_state: Optional[Callable[[dict], None]] = None
+        self.listening = False
+        self.resubscribes = 0
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def started(self) -> bool:
+        return self.redis is not None and self.listening
+
+    async def start(
+        self,
+        redis: Redis,
+        deliver: Callable[[str, list[str], str], None],
+        local_presence: Callable[[], dict],
+        on_state: Callable[[dict], None]
+    ):
+        self.deliver = deliver
+        self.local_presence = local_presence
+        self.on_state = on_state
+
+        self.redis = redis
+        try:
+            pubsub = await self._subscribe()
+        except Exception:
+            self.redis = None
+            raise
+
+        self._tasks = [
+            asyncio.create_task(self._listen(pubsub)),
+            asyncio.create_task(self._report_presence())
+        ]
+        logger.info(f"📡 Воркер {self.worker_id} подписан на канал {self.channel}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.listening = False
+
+        if self.redis is not None:
+            try:
+                await self.redis.delete(self._presence_key(self.worker_id))
+                await self.redis.srem(self.workers_key, self.worker_id)
+            except Exception as e:
+                logger.error(f"Ошибка при снятии присутствия воркера {self.worker_id}: {str(e)}")
+            self.redis = None
+
+    async def publish(self, message_type: str, roles: list[str], frame: str) -> int:
+        envelope = HEADER_SEPARATOR.join((message_type, ROLES_SEPARATOR.join(roles), frame))
+        return await self.redis.publish(self.channel, envelope)
+
+    async def publish_state(self, payload: dict) -> int:
+        envelope = json.dumps({"origin": self.worker_id, **payload}, ensure_ascii=False)
+        return await self.redis.publish(self.state_channel, envelope)
+
+    async def _subscribe(self):
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(self.channel, self.state_channel)
+        except Exception:
+            await pubsub.aclose()
+            raise
+        return pubsub
+
+    async def _listen(self, pubsub):
+        state_channel = self.state_channel.encode("utf-8")
+        delay = RESUBSCRIBE_MIN_DELAY
+        while True:
+            try:
+                if pubsub is None:
+                    pubsub = await self._subscribe()
+                    self.resubscribes += 1
+                    logger.info(f"📡 Воркер {self.worker_id} снова подписан на канал {self.channel}")
+                self.listening = True
+                delay = RESUBSCRIBE_MIN_DELAY
+
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        if message["channel"] == state_channel:
+                            payload = json.loads(message["data"])
+                            if payload.pop("origin", None) != self.worker_id:
+                                self.on_state(payload)
+                            continue
+
+                        message_type, roles, frame = message["data"].decode("utf-8").split(HEADER_SEPARATOR, 2)
+                        self.deliver(message_type, roles.split(ROLES_SEPARATOR), frame)
+                    except Exception as e:
+                        logger.error(f"Ошибка при разборе сообщения шины: {str(e)}")
+                logger.error(f"Подписка воркера {self.worker_id} на шину завершилась, переподписка через {delay} с")
+            except Exception as e:
+                logger.error(f"Подписка воркера {self.worker_id} на шину потеряна, переподписка через {delay} с: {str(e)}")
+            finally:
+                self.listening = False
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+                    pubsub = None
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RESUBSCRIBE_MAX_DELAY)
+
+    def _presence_key(self, worker_id: str) -> str:
+        return self.prefix + PRESENCE_KEY.format(worker_id=worker_id)
+
+    async def _report_presence(self):
+        key = self._presence_key(self.worker_id)
+        while True:
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    pipe.hset(key, mapping=self.local_presence())
+                    pipe.expire(key, PRESENCE_TTL)
+                    pipe.sadd(self.workers_key, self.worker_id)
+                    await pipe.execute()
+            except Exception as e:
+                logger.error(f"Ошибка при публикации присутствия воркера: {str(e)}")
+            await asyncio.sleep(PRESENCE_INTERVAL)
+
+    async def presence(self) -> dict:
+        """Суммарные счетчики подключений по всем живым воркерам"""
+        workers = [worker.decode("utf-8") for worker in await self.redis.smembers(self.workers_key)]
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for worker in workers:
+                pipe.hgetall(self._presence_key(worker))
+            results = await pipe.execute()
+
+        totals = {"workers": 0, "players": 0, "spectators": 0}
+        stale_workers = []
+        for worker, counters in zip(workers, results):
+            if not counters:
+                stale_workers.append(worker)
+                continue
+            totals["workers"] += 1
+            totals["players"] += int(counters.get(b"players", 0))
+            totals["spectators"] += int(counters.get(b"spectators", 0))
+
+        if stale_workers:
+            await self.redis.srem(self.workers_key, *stale_workers)
+
+        return totals
+
+    def stats(self) -> dict:
+        return {"worker_id": self.worker_id, "listening": self.started, "resubscribes": self.resubscribes}
+
+
+bus = BroadcastBus()
@@ -0,0 +1,218 @@
+import asyncio
+import time
+
+from collections import deque
+from datetime import datetime
+from typing import Awaitable, Callable, Iterable, Optional, ValuesView
+
+from fastapi import WebSocket
+
+from config.logger import setup_logging
+
+logger = setup_logging()
+
+PLAYER = "player"
+SPECTATOR = "spectator"
+
+SEND_QUEUE_SIZE = 64
+DELIVERY_REPORTS_LIMIT = 50
+
+
+class DeliveryReport:
+    """Итог одной рассылки: сколько кадров поставлено в очереди, отправлено и потеряно"""
+
+    __slots__ = ("message_type", "created_at", "queued", "sent", "dropped")
+
+    def __init__(self, message_type: str):
+        self.message_type = message_type
+        self.created_at = datetime.now()
+        self.queued = 0
+        self.sent = 0
+        self.dropped = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "type": self.message_type,
+            "created_at": self.created_at.strftime('%H:%M:%S.%f'),
+            "queued": self.queued,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "pending": self.queued - self.sent - self.dropped
+        }
+
+
+class Connection:
+    """
+    Запись об одном WebSocket подключении с собственной исходящей очередью.
+
+    Рассылка только кладет кадр в очередь, а отправкой занимается отдельная
+    задача-писатель. Если очередь переполнена или отправка упала, подключение
+    снимается через on_drop (handle_disconnect), не задерживая остальных.
+    """
+
+    __slots__ = (
+        "role", "name", "websocket", "connected_at", "last_seen",
+        "bytes_sent", "queue", "task", "closed", "on_drop", "rating_version",
+        "ponged"
+    )
+
+    def __init__(
+        self,
+        role: str,
+        name: str | int,
+        websocket: WebSocket,
+        on_drop: Callable[["Connection"], Awaitable[None]],
+        maxsize: int = SEND_QUEUE_SIZE
+    ):
+        self.role = role
+        self.name = name
+        self.websocket = websocket
+        self.connected_at = datetime.now()
+        self.last_seen = time.monotonic()
+        self.bytes_sent = 0
+        self.queue: asyncio.Queue[tuple[str, int, Optional[DeliveryReport]]] = asyncio.Queue(maxsize=maxsize)
+        self.closed = False
+        self.on_drop = on_drop
+        # Последняя версия рейтинга, которую подтвердил клиент
+        self.rating_version: Optional[int] = None
+        # Клиент отвечает на пинги, значит его молчание можно считать обрывом
+        self.ponged = False
+        self.task = asyncio.create_task(self._writer())
+
+    @property
+    def queue_depth(self) -> int:
+        return self.queue.qsize()
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+
+    def enqueue(self, frame: str, size: int = 0, report: Optional[DeliveryReport] = None) -> bool:
+        if report:
+            report.queued += 1
+
+        if self.closed:
+            if report:
+                report.dropped += 1
+            return False
+
+        try:
+            self.queue.put_nowait((frame, size, report))
+        except asyncio.QueueFull:
+            logger.warning(f"⚠️ Очередь подключения {self.role} {self.name} переполнена, отключаем медленного клиента")
+            if report:
+                report.dropped += 1
+            self._drop()
+            return False
+
+        return True
+
+    async def _writer(self):
+        while True:
+            frame, size, report = await self.queue.get()
+            try:
+                await self.websocket.send_text(frame)
+            except asyncio.CancelledError:
+                if report:
+                    report.dropped += 1
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка при отправке в подключение {self.role} {self.name}: {str(e)}")
+                if report:
+                    report.dropped += 1
+                self._drop()
+                return
+            self.bytes_sent += size
+            if report:
+                report.sent += 1
+
+    def _drop(self):
+        if self.closed:
+            return
+        self.close()
+        asyncio.create_task(self.on_drop(self))
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+
+        while not self.queue.empty():
+            _, _, report = self.queue.get_nowait()
+            if report:
+                report.dropped += 1
+
+        if self.task is not asyncio.current_task():
+            self.task.cancel()
+
+    def as_dict(self) -> dict:
+        return {
+            "role": self.role,
+            "name": self.name,
+            "connected_at": self.connected_at.strftime('%H:%M:%S'),
+            "idle_seconds": round(time.monotonic() - self.last_seen, 1),
+            "bytes_sent": self.bytes_sent,
+            "queue_depth": self.queue_depth,
+            "rating_version": self.rating_version
+        }
+
+
+class ConnectionHub:
+    """
+    Реестр подключений воркера: игроки по имени, зрители по id(websocket).
+
+    Добавление и удаление - O(1), обход по роли идет по представлению словаря
+    без копирования. Это безопасно, потому что постановка в очередь синхронная,
+    а снятие упавших подключений откладывается в отдельную задачу.
+    """
+
+    def __init__(self):
+        self._connections: dict[str, dict[str | int, Connection]] = {PLAYER: {}, SPECTATOR: {}}
+        self.delivery_reports: deque[DeliveryReport] = deque(maxlen=DELIVERY_REPORTS_LIMIT)
+
+    def add(self, connection: Connection):
+        self._connections[connection.role][connection.name] = connection
+
+    def remove(self, connection: Connection) -> bool:
+        connections = self._connections[connection.role]
+        if connections.get(connection.name) is not connection:
+            return False
+        del connections[connection.name]
+        return True
+
+    def get(self, role: str, name: str | int) -> Optional[Connection]:
+        return self._connections[role].get(name)
+
+    def connections(self, role: str) -> ValuesView[Connection]:
+        return self._connections[role].values()
+
+    def count(self, role: str) -> int:
+        return len(self._connections[role])
+
+    def unicast(self, connection: Connection, frame: str) -> bool:
+        return connection.enqueue(frame, len(frame.encode()))
+
+    def multicast(self, message_type: str, roles: Iterable[str], frame: str) -> DeliveryReport:
+        report = DeliveryReport(message_type)
+        size = len(frame.encode())
+
+        for role in roles:
+            for connection in self._connections[role].values():
+                connection.enqueue(frame, size, report)
+
+        self.delivery_reports.append(report)
+        return report
+
+    def stats(self) -> dict:
+        stats = {}
+        for role, connections in self._connections.items():
+            depths = [connection.queue_depth for connection in connections.values()]
+            stats[role] = {
+                "count": len(connections),
+                "queued_frames": sum(depths),
+                "max_queue_depth": max(depths, default=0),
+                "bytes_sent": sum(connection.bytes_sent for connection in connections.values())
+            }
+        return stats
+
+
+hub = ConnectionHub()
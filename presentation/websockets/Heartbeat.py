@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+from typing import Awaitable, Callable, Optional
+
+from fastapi import WebSocketDisconnect
+
+from presentation.websockets.ConnectionHub import Connection
+from config.logger import setup_logging
+
+logger = setup_logging()
+
+PING_INTERVAL = 10
+INACTIVE_TIMEOUT = 30
+WHEEL_SLOTS = 10
+
+PING_FRAME = '{"type":"ping"}'
+
+
+class HeartbeatWheel:
+    """
+    Единый планировщик пингов и очистки неактивных подключений.
+
+    Подключения разложены по ячейкам колеса, за один такт обрабатывается
+    одна ячейка, поэтому каждое подключение пингуется раз в PING_INTERVAL
+    секунд, а нагрузка равномерно размазана по интервалу. Пинг - это
+    заранее сериализованный кадр {"type": "ping"} через очередь подключения.
+
+    Таймаут молчания применяется только к клиентам, которые хотя бы раз
+    ответили pong: для них подключение живо, пока за INACTIVE_TIMEOUT
+    приходит любое сообщение. Клиенты, не умеющие отвечать на пинги
+    (например, экран зрителя, который только слушает), по молчанию не
+    снимаются - обрыв транспорта для них отслеживает uvicorn своими
+    WebSocket пингами (--ws-ping-interval / --ws-ping-timeout).
+    Мертвые подключения снимаются пачкой в конце такта, а цикл чтения
+    подключения через receive() завершается по тому же правилу.
+    """
+
+    def __init__(self, interval: float = PING_INTERVAL, timeout: float = INACTIVE_TIMEOUT, slots: int = WHEEL_SLOTS):
+        self.interval = interval
+        self.timeout = timeout
+        self.slots: list[set[Connection]] = [set() for _ in range(slots)]
+        self.cursor = 0
+        self.evicted = 0
+        self.on_dead: Optional[Callable[[Connection], Awaitable[None]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._slot_of: dict[Connection, int] = {}
+
+    def track(self, connection: Connection):
+        # Новое подключение попадает в ячейку, до которой колесо дойдет последней
+        slot = (self.cursor - 1) % len(self.slots)
+        self.slots[slot].add(connection)
+        self._slot_of[connection] = slot
+
+    def untrack(self, connection: Connection):
+        slot = self._slot_of.pop(connection, None)
+        if slot is not None:
+            self.slots[slot].discard(connection)
+
+    def start(self, on_dead: Callable[[Connection], Awaitable[None]]):
+        self.on_dead = on_dead
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        tick = self.interval / len(self.slots)
+        while True:
+            await asyncio.sleep(tick)
+            try:
+                await self._tick()
+            except Exception as e:
+                logger.error(f"Ошибка в планировщике пингов: {str(e)}")
+
+    async def _tick(self):
+        slot = self.slots[self.cursor]
+        self.cursor = (self.cursor + 1) % len(self.slots)
+
+        now = time.monotonic()
+        dead = []
+        for connection in slot:
+            if connection.closed or self._expired(connection, now):
+                dead.append(connection)
+            else:
+                connection.enqueue(PING_FRAME, len(PING_FRAME))
+
+        if not dead:
+            return
+
+        for connection in dead:
+            self.untrack(connection)
+        self.evicted += len(dead)
+        logger.warning(f"🔴 Снимаем неактивные подключения: {len(dead)}")
+        await asyncio.gather(*(self.on_dead(connection) for connection in dead), return_exceptions=True)
+
+    def pong(self, connection: Connection):
+        connection.ponged = True
+
+    async def receive(self, connection: Connection) -> str:
+        """Следующее сообщение клиента; молчание дольше timeout - обрыв, если клиент отвечает на пинги"""
+        if connection.ponged:
+            try:
+                data = await asyncio.wait_for(connection.websocket.receive_text(), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                raise WebSocketDisconnect(code=1001, reason="heartbeat timeout")
+        else:
+            data = await connection.websocket.receive_text()
+        connection.touch()
+        return data
+
+    def _expired(self, connection: Connection, now: float) -> bool:
+        return connection.ponged and now - connection.last_seen > self.timeout
+
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self._slot_of),
+            "evicted": self.evicted,
+            "ping_interval": self.interval,
+            "inactive_timeout": self.timeout
+        }
+
+
+heartbeat = HeartbeatWheel()
@@ -1,161 +1,180 @@
 import json
-import random
 import time
-import asyncio
 
 from typing import List
-from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
-from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
 
-from schemas.questions import QuestionSchema, QuestionReadSchema
-from dependencies import get_game_service, get_user_service, get_question_service, get_answer_service, get_db, get_redis
+from schemas.answers import GradeApplySchema, ClusterAcceptSchema, AnswerFilterSchema
+from dependencies import get_game_service, get_user_service, get_question_service, get_answer_service, get_db, get_redis_connection, get_unit_of_work, create_unit_of_work
+from repositories import UnitOfWork
 from services.users.UserService import UserService
-from services.games.GameService import GameService
+from services.users.Leaderboard import leaderboard, RatingUpdate, FULL, DELTA
+from services.games.GameState import game_state
+from services.games.GameTimer import game_timer, TIMER_DURATION
 from services.answers.AnswerService import AnswerService
 from services.questions.QuestionService import QuestionService
-
+from services.questions.QuestionPrefetcher import question_prefetcher
+from services.answers.AnswerBatcher import answer_batcher
+from services.answers.AnswerGate import answer_gate
+from services.answers.AnswerGrader import answer_grader, AnswerGrade
+from services.answers.SpeedBonus import speed_bonus_scores
+from services.answers.AnswerClusters import answer_clusters, CLUSTERS_LIMIT, CLUSTER_TEAMS_LIMIT
+
+from presentation.websockets.ConnectionHub import Connection, DeliveryReport, hub, PLAYER, SPECTATOR
+from presentation.websockets.BroadcastBus import bus
+from presentation.websockets.Heartbeat import heartbeat
 from config.logger import setup_logging
 
 logger = setup_logging()
 
 router = APIRouter(prefix="/websocket", tags=["WebSocket"])
 
-active_players = {}  # {username: {'ws': WebSocket, 'connection_id': str}}
-active_spectators = {}  # {id: WebSocket}
-spectator_last_activity = {}  # {id: datetime}
-answered_users = set()  
-
-INACTIVE_TIMEOUT = 10
-CLEANUP_INTERVAL = 5
-
-_game_status_cache = None
-_game_status_cache_time = 0
-CACHE_TIMEOUT = 1
-
-_sections_cache = None
-_sections_cache_time = 0
-SECTIONS_CACHE_TIMEOUT = 60
-
-_rating_cache = None
-_rating_cache_time = 0
-RATING_CACHE_TIMEOUT = 5
-
-async def get_cached_game_status(service_game: GameService, force_update: bool = False):
-    global _game_status_cache, _game_status_cache_time
-    current_time = time.time()
-
-    if force_update or _game_status_cache is None or (current_time - _game_status_cache_time) > CACHE_TIMEOUT:
-        _game_status_cache = await service_game.get_all_status()
-        _game_status_cache_time = current_time
-
-    return _game_status_cache
-
-async def invalidate_game_status_cache():
-    global _game_status_cache
-    _game_status_cache = None
-
-async def is_connection_active(websocket: WebSocket) -> bool:
-    try:
-        await websocket.send_text("")
-        return True
-    except Exception as e:
-        logger.error(f"Ошибка проверки соединения: {str(e)}")
-        return False
-
-async def get_cached_sections(service_game: GameService, force_update: bool = False):
-    global _sections_cache, _sections_cache_time
-    current_time = time.time()
-    
-    if force_update or _sections_cache is None or (current_time - _sections_cache_time) > SECTIONS_CACHE_TIMEOUT:
-        _sections_cache = await service_game.get_sections()
-        _sections_cache_time = current_time
-        
-    return _sections_cache
-
-async def get_cached_rating(service_user: UserService, force_update: bool = False):
-    global _rating_cache, _rating_cache_time
-    current_time = time.time()
-    
-    if force_update or _rating_cache is None or (current_time - _rating_cache_time) > RATING_CACHE_TIMEOUT:
-        _rating_cache = await service_user.get_all_user()
-        _rating_cache_time = current_time
-        
-    return _rating_cache
+ACCEPTED_ANSWER_FRAME = '{"type":"answer","status":"accepted"}'
+DUPLICATE_ANSWER_FRAME = '{"type":"answer","status":"duplicate"}'
+REJECTED_ANSWER_FRAME = '{"type":"answer","status":"rejected"}'
+LATE_ANSWER_FRAME = '{"type":"answer","status":"late"}'
+
+def restage_current_section():
+    """Сбрасывает подготовленный вопрос после изменения колоды в обход /admin/next"""
+    question_prefetcher.invalidate()
+    status = game_state.snapshot
+    if status.game_started and not status.game_over and status.current_section:
+        question_prefetcher.stage(status.current_section)
+
+def encode_frame(message: dict) -> str:
+    """Сериализует сообщение один раз для всех получателей рассылки"""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+def encode_rating_frame(message: dict) -> str:
+    """Сериализует сообщение рейтинга и учитывает размер кадра и время кодирования"""
+    start_time = time.perf_counter()
+    frame = encode_frame(message)
+    leaderboard.record_frame(message["mode"], len(frame.encode()), (time.perf_counter() - start_time) * 1000)
+    return frame
+
+def rating_snapshot_message(update: RatingUpdate) -> dict:
+    return {
+        "type": "rating",
+        "mode": FULL,
+        "version": update.version,
+        "content": update.players,
+        "section": game_state.snapshot.current_section
+    }
+
+def rating_delta_message(update: RatingUpdate) -> dict:
+    return {
+        "type": "rating",
+        "mode": DELTA,
+        "version": update.version,
+        "base": update.base,
+        "changes": update.changes,
+        "removed": update.removed,
+        "section": game_state.snapshot.current_section
+    }
+
+async def broadcast_rating_update(service_user: UserService):
+    """Рассылает зрителям только изменившиеся строки рейтинга, если рейтинг сейчас на экране"""
+    if game_state.snapshot.spectator_display_mode != "rating":
+        return
+    update = await leaderboard.publish(service_user)
+    if update.version == update.base:
+        return
+    await publish_frame("rating", [SPECTATOR], encode_rating_frame(rating_delta_message(update)))
+
+async def send_rating_snapshot(connection: Connection):
+    """Полный снимок рейтинга одному зрителю: по запросу или если он отстал от текущей версии"""
+    async with create_unit_of_work() as uow:
+        update = await leaderboard.snapshot(UserService(repository=uow.users))
+    connection.rating_version = update.version
+    hub.unicast(connection, encode_rating_frame(rating_snapshot_message(update)))
 
 @router.post("/")
 async def add_gamestatus(
     service: AnswerService = Depends(get_game_service),
-    db: AsyncSession = Depends(get_db)
+    uow: UnitOfWork = Depends(get_unit_of_work)
 ):
     try:
         new_gamestatus = await service.add_gamestatus()
+        # Снимок перечитывается отдельной сессией, поэтому сначала коммитим
+        await uow.commit()
+        await game_state.reload()
         return new_gamestatus
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/admin/add_point/{player_name}")
-async def add_point(player_name: str, service: UserService = Depends(get_user_service)):
+async def add_point(
+    player_name: str,
+    service: UserService = Depends(get_user_service),
+    uow: UnitOfWork = Depends(get_unit_of_work)
+):
     await service.add_score_to_user(username=player_name, points=1)
+    await uow.commit()
+    await leaderboard.add_score(player_name, 1)
+    await broadcast_rating_update(service)
     return {"message": "OK"}
 
 @router.post("/admin/remove_point/{player_name}")
-async def remove_point(player_name: str, service: UserService = Depends(get_user_service)):
+async def remove_point(
+    player_name: str,
+    service: UserService = Depends(get_user_service),
+    uow: UnitOfWork = Depends(get_unit_of_work)
+):
     await service.add_score_to_user(username=player_name, points=-1)
+    await uow.commit()
+    await leaderboard.add_score(player_name, -1)
+    await broadcast_rating_update(service)
     return {"message": "OK"}
 
 @router.post("/get_all_status")
-async def get_all_status(service: AnswerService = Depends(get_game_service)):
-    status = await service.get_all_status()
-    return {"status": status}
+async def get_all_status():
+    return {"status": game_state.snapshot.as_dict()}
 
 @router.get("/admin/sections")
-async def get_all_sections(service: GameService = Depends(get_game_service)):
-    sections = await service.get_sections()
-    return {"sections": sections}
+async def get_all_sections():
+    return {"sections": game_state.snapshot.sections}
 
 @router.post("/admin/update_sections")
-async def update_sections(
-    sections: List[str],
-    service: GameService = Depends(get_game_service)
-):
+async def update_sections(sections: List[str]):
     try:
-        sections_string = ".".join(sections)
-        await service.update_sections(sections_string)
+        await game_state.update(sections=sections)
         return {"message": "Разделы успешно обновлены", "sections": sections}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при обновлении разделов: {str(e)}")
 
+@router.get("/admin/state")
+async def get_state():
+    """Состояние игры в памяти воркера, версия, уже записанная в БД, и таймер"""
+    return {**game_state.stats(), "timer": game_timer.stats(), "leaderboard": leaderboard.stats()}
+
 @router.post("/admin/start")
 async def start_game(
-    service_game: GameService = Depends(get_game_service),
     service_user: UserService = Depends(get_user_service),
-    service_answer: AnswerService = Depends(get_answer_service),
     service_question: QuestionService = Depends(get_question_service)
 ):
     try:
-        global answered_users
-        answered_users = set()
-
-        sections = await service_game.get_sections()
+        sections = game_state.snapshot.sections
         if not sections:
             raise HTTPException(status_code=400, detail="Нет доступных разделов")
 
-        for section in sections:
-            if not await service_question.has_questions(section):
-                await service_question.load_questions_to_redis(section)
+        await answer_gate.clear()
+        await answer_clusters.clear()
+
+        missing = await service_question.missing_sections(sections)
+        if missing:
+            await service_question.load_decks(missing)
+
+        await game_state.update(current_section_index=0, game_started=True, game_over=False)
+        restage_current_section()
 
-        await service_game.start_game(0, True, False)
-    
         first_section = sections[0]
         section_message = f"Раунд 1: {first_section}"
-        
+
         await broadcast_message(
             message_type="question",
             content=section_message,
-            service_game=service_game,
-            service_user=service_user,
-            service_answer=service_answer
+            service_user=service_user
         )
         return {"message": "Игра начата"}
 
@@ -164,378 +183,401 @@ async def start_game(
         raise HTTPException(status_code=500, detail=f"Ошибка при запуске игры: {str(e)}")
 
 @router.post("/admin/stop")
-async def stop_game(
-    service_game: GameService = Depends(get_game_service),
-    service_user: UserService = Depends(get_user_service),
-    service_answer: AnswerService = Depends(get_answer_service)
-):
-    await service_game.stop_game()
+async def stop_game(service_user: UserService = Depends(get_user_service)):
+    await game_timer.cancel()
+    await game_state.reset()
+    question_prefetcher.invalidate()
     await broadcast_message(
         message_type="question",
         content="clear_storage",
-        service_game=service_game,
-        service_user=service_user,
-        service_answer=service_answer
+        service_user=service_user
     )
     await broadcast_message(
         message_type="question",
         content="Игра завершена администратором.",
-        service_game=service_game,
-        service_user=service_user,
-        service_answer=service_answer
+        service_user=service_user
     )
     return {"message": "Игра остановлена"}
 
 @router.post("/admin/show_rating")
-async def show_rating(
-    service_game: GameService = Depends(get_game_service),
-    service_user: UserService = Depends(get_user_service),
-    service_answer: AnswerService = Depends(get_answer_service)
-):
-    await service_game.switch_display_mode("rating")
+async def show_rating(service_user: UserService = Depends(get_user_service)):
+    await game_state.update(spectator_display_mode="rating")
     await broadcast_message(
         message_type="rating",
         content=None,
-        service_game=service_game,
         service_user=service_user,
-        service_answer=service_answer,
         force_update=True
     )
     return {"message": "Рейтинг показан"}
 
 @router.post("/admin/show_question")
-async def show_question(
-    service_game: GameService = Depends(get_game_service),
-    service_user: UserService = Depends(get_user_service),
-    service_answer: AnswerService = Depends(get_answer_service)
-):
-    await service_game.switch_display_mode("question")
-    await service_game.update_answer_status(False)
-    
-    status = await get_cached_game_status(service_game, force_update=True)
+async def show_question(service_user: UserService = Depends(get_user_service)):
+    status = await game_state.update(spectator_display_mode="question", show_answer=False)
     await broadcast_message(
         message_type="question",
         content=status.current_question or "Ожидайте вопрос",
-        service_game=service_game,
         service_user=service_user,
-        service_answer=service_answer,
         force_update=True
     )
     return {"message": "Вопрос показан"}
 
 @router.post("/admin/show_answer")
-async def update_answer_status(
-    service_game: GameService = Depends(get_game_service),
-    service_user: UserService = Depends(get_user_service),
-    service_answer: AnswerService = Depends(get_answer_service)
-):
-    await service_game.update_answer_status(True)
-    status = await get_cached_game_status(service_game, force_update=True)
+async def update_answer_status(service_user: UserService = Depends(get_user_service)):
+    status = await game_state.update(show_answer=True)
     await broadcast_message(
         message_type="question",
         content=status.current_question or "Ожидайте вопрос",
-        service_game=service_game,
-        service_user=service_user,
-        service_answer=service_answer
+        service_user=service_user
     )
     return {"message": "Правильный ответ показан"}
 
 
 @router.post("/admin/start_timer")
 async def start_timer(
-    service_game: GameService = Depends(get_game_service),
-    service_user: UserService = Depends(get_user_service),
-    service_answer: AnswerService = Depends(get_answer_service)
+    seconds: int = TIMER_DURATION,
+    show_answer_on_expiry: bool = False,
+    service_user: UserService = Depends(get_user_service)
 ):
-    """Запускает таймер на 40 секунд"""
-    await service_game.update_timer_status(True)
-    status = await get_cached_game_status(service_game, force_update=True)
+    """Запускает серверный таймер; по истечении можно сразу показать ответ"""
+    status = await game_state.update(timer=True)
+    await game_timer.start(
+        duration=seconds,
+        on_event=broadcast_timer_event,
+        on_expire=reveal_answer if show_answer_on_expiry else None
+    )
     await broadcast_message(
         message_type="question",
         content=status.current_question or "Ожидайте вопрос",
-        service_game=service_game,
-        service_user=service_user,
-        service_answer=service_answer
+        service_user=service_user
+    )
+    return {"message": f"Таймер запущен на {seconds} секунд"}
+
+async def broadcast_timer_event(event: str, remaining: int):
+    message = {"type": "timer", "event": event, "remaining": remaining, "duration": game_timer.duration}
+    await publish_frame("timer", [PLAYER, SPECTATOR], encode_frame(message))
+
+async def reveal_answer():
+    status = await game_state.update(show_answer=True)
+    await broadcast_message(
+        message_type="question",
+        content=status.current_question or "Ожидайте вопрос",
+        service_user=None
     )
-    return {"message": "Таймер запущен на 40 секунд"}
 
 
 @router.get("/admin/answers")
-async def get_answers(service_answer: AnswerService = Depends(get_answer_service)):
-    answers = await service_answer.get_all_answers()
-    return {"answers": answers}
+async def get_answers(
+    after: int | None = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    service_answer: AnswerService = Depends(get_answer_service)
+):
+    """Ответы текущей игры постранично; следующая страница - с after=next_cursor"""
+    filters = AnswerFilterSchema(game_id=game_state.snapshot.id)
+    answers = await service_answer.get_answers_page(filters=filters, after=after, limit=limit)
+    return {"answers": answers, "next_cursor": answers[-1].id if len(answers) == limit else None}
+
+async def current_answers(service_answer: AnswerService) -> dict:
+    """Первый ответ каждого игрока на текущий вопрос"""
+    status = game_state.snapshot
+    if status.current_question_id is None:
+        return {}
+    submitted = await service_answer.get_answers_by_question_id(question_id=status.current_question_id, game_id=status.id)
+    answers = {}
+    for answer in submitted:
+        answers.setdefault(answer.username, answer)
+    return answers
+
+def grade_answers_by_reference(answers: dict) -> list[AnswerGrade]:
+    return answer_grader.grade(
+        game_state.snapshot.answer_for_current_question,
+        ((username, answer.answer) for username, answer in answers.items())
+    )
+
+@router.get("/admin/grade")
+async def grade_answers(service_answer: AnswerService = Depends(get_answer_service)):
+    """Предлагает, какие ответы на текущий вопрос правильные, с уверенностью оценки"""
+    answers = await current_answers(service_answer)
+    grades = grade_answers_by_reference(answers)
+    return {
+        "question": game_state.snapshot.current_question,
+        "reference": game_state.snapshot.answer_for_current_question,
+        "grades": [{**grade.as_dict(), "received_us": answers[grade.username].received_us} for grade in grades],
+        "elapsed_ms": round(answer_grader.last_ms, 3)
+    }
+
+@router.post("/admin/grade/apply")
+async def apply_grades(
+    grade_in: GradeApplySchema,
+    service_answer: AnswerService = Depends(get_answer_service),
+    service_user: UserService = Depends(get_user_service),
+    uow: UnitOfWork = Depends(get_unit_of_work)
+):
+    """Начисляет очки принятым ответам одной транзакцией и один раз обновляет рейтинг"""
+    usernames = grade_in.usernames
+    answers = {}
+    if usernames is None or grade_in.speed_bonus:
+        answers = await current_answers(service_answer)
+    if usernames is None:
+        usernames = [grade.username for grade in grade_answers_by_reference(answers) if grade.correct]
+    return await award_points(usernames, grade_in, answers, service_user, uow)
+
+CLUSTERS_LIMIT_MAX = 500
+CLUSTER_TEAMS_LIMIT_MAX = 200
+
+@router.get("/admin/clusters")
+async def get_answer_clusters(
+    limit: int = Query(CLUSTERS_LIMIT, ge=1, le=CLUSTERS_LIMIT_MAX),
+    teams_limit: int = Query(CLUSTER_TEAMS_LIMIT, ge=1, le=CLUSTER_TEAMS_LIMIT_MAX)
+):
+    """Ответы на текущий вопрос, сгруппированные по нормализованному тексту, с оценкой каждой группы"""
+    status = game_state.snapshot
+    total, clusters = await answer_clusters.clusters(status.current_question_id, limit=limit, teams_limit=teams_limit)
+    # Группа оценивается один раз по образцу, а не по каждому ответу
+    samples = ((cluster["text"], cluster["sample"]) for cluster in clusters)
+    grades = {grade.username: grade for grade in answer_grader.grade(status.answer_for_current_question, samples)}
+    for cluster in clusters:
+        grade = grades[cluster["text"]]
+        cluster.update(correct=grade.correct, confidence=round(grade.confidence, 3))
+    return {
+        "question_id": status.current_question_id,
+        "question": status.current_question,
+        "reference": status.answer_for_current_question,
+        "answers": total,
+        "clusters": clusters
+    }
+
+@router.post("/admin/clusters/accept")
+async def accept_answer_clusters(
+    accept_in: ClusterAcceptSchema,
+    service_answer: AnswerService = Depends(get_answer_service),
+    service_user: UserService = Depends(get_user_service),
+    uow: UnitOfWork = Depends(get_unit_of_work)
+):
+    """Начисляет очки всем командам из выбранных групп ответов одним действием"""
+    question_id = game_state.snapshot.current_question_id
+    # Сначала отмечаем группы: повторное или двойное нажатие не начислит очки второй раз
+    clusters = await answer_clusters.mark_accepted(question_id, accept_in.clusters)
+    try:
+        usernames = await answer_clusters.teams(question_id, clusters)
+        answers = await current_answers(service_answer) if accept_in.speed_bonus else {}
+        result = await award_points(usernames, accept_in, answers, service_user, uow)
+    except Exception:
+        await answer_clusters.unmark_accepted(question_id, clusters)
+        raise
+    return {**result, "clusters": clusters}
+
+async def award_points(
+    usernames: list[str],
+    grade_in: GradeApplySchema,
+    answers: dict,
+    service_user: UserService,
+    uow: UnitOfWork
+) -> dict:
+    """Начисляет очки одним UPDATE, затем обновляет рейтинг и рассылает одно изменение"""
+    if grade_in.speed_bonus:
+        received = {username: answers[username].received_us if username in answers else None for username in usernames}
+        scores = speed_bonus_scores(received, grade_in.points, grade_in.bonus, grade_in.window)
+    else:
+        scores = {username: grade_in.points for username in usernames}
+
+    try:
+        users = await service_user.add_scores_to_users(scores=scores)
+        await uow.commit()
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    if scores:
+        await leaderboard.add_scores(scores)
+        await broadcast_rating_update(service_user)
+    return {"users": users, "scores": scores}
 
 @router.post("/admin/reload-questions")
 async def reload_questions(
     section: str,
+    seed: int | None = None,
     service_question: QuestionService = Depends(get_question_service)
 ):
-    await service_question.load_questions_to_redis(section)
+    await service_question.load_questions_to_redis(section, seed=seed)
+    restage_current_section()
     return {"status": f"Questions for {section} reloaded"}
 
+@router.get("/admin/decks")
+async def get_decks(service_question: QuestionService = Depends(get_question_service)):
+    """Остаток вопросов, число показанных и seed колоды по всем разделам"""
+    return {"decks": await service_question.deck_stats(game_state.snapshot.sections)}
+
+DECK_PEEK_LIMIT = 50
+
+@router.get("/admin/decks/{section}/peek")
+async def peek_deck(
+    section: str,
+    count: int = Query(5, ge=1, le=DECK_PEEK_LIMIT),
+    service_question: QuestionService = Depends(get_question_service)
+):
+    """Следующие count вопросов колоды без извлечения"""
+    return {"section": section, "questions": await service_question.peek_questions(section, count)}
+
+@router.post("/admin/decks/{section}/return")
+async def return_to_deck(section: str, service_question: QuestionService = Depends(get_question_service)):
+    """Возвращает последний показанный вопрос раздела в начало колоды"""
+    question = await service_question.return_question(section)
+    restage_current_section()
+    if question is None:
+        raise HTTPException(status_code=404, detail="В разделе нет показанных вопросов")
+    return {"section": section, "question": question}
+
+@router.post("/admin/decks/{section}/restart")
+async def restart_deck(section: str, service_question: QuestionService = Depends(get_question_service)):
+    """Перезапускает раздел: колода восстанавливается в исходном порядке"""
+    remaining = await service_question.restart_section(section)
+    restage_current_section()
+    return {"section": section, "remaining": remaining}
+
+async def finish_game(service_user: UserService, content: str = "Игра завершена!") -> dict:
+    await game_timer.cancel()
+    await game_state.update(game_over=True)
+    question_prefetcher.invalidate()
+    await broadcast_message(
+        message_type="question",
+        content=content,
+        service_user=service_user
+    )
+    return {"message": "Все разделы пройдены"}
+
+async def switch_section(
+    section_index: int,
+    service_user: UserService,
+    service_question: QuestionService
+) -> dict:
+    """Переводит игру в раздел section_index и объявляет раунд"""
+    new_section = game_state.snapshot.sections[section_index]
+    await game_timer.cancel()
+
+    if not await service_question.has_questions(new_section):
+        await service_question.load_questions_to_redis(new_section)
+
+    await game_state.update(
+        current_section_index=section_index,
+        current_question_id=None,
+        current_question=None,
+        answer_for_current_question=None,
+        current_question_image="None",
+        current_answer_image="None",
+        timer=False,
+        show_answer=False
+    )
+    restage_current_section()
+
+    section_message = f"Раунд {section_index + 1}: {new_section}"
+    await broadcast_message(
+        message_type="question",
+        content=section_message,
+        service_user=service_user
+    )
+    return {"message": f"Переход к разделу: {new_section}"}
+
 @router.post("/admin/next")
 async def next_question(
     service_question: QuestionService = Depends(get_question_service),
-    service_game: GameService = Depends(get_game_service),
-    service_user: UserService = Depends(get_user_service),
-    service_answer: AnswerService = Depends(get_answer_service)
+    service_user: UserService = Depends(get_user_service)
 ):
     logger.info("Starting next question procedure")
     start_time = datetime.now()
 
-    global answered_users
-    answered_users = set()
-
-    status = await get_cached_game_status(service_game)
+    status = game_state.snapshot
     if not status.game_started or status.game_over:
         return {"message": "Игра не активна"}
 
-    sections = await service_game.get_sections()
+    sections = status.sections
     current_section_index = status.current_section_index
 
     if not sections:
         raise HTTPException(status_code=400, detail="Нет доступных разделов")
 
     if current_section_index >= len(sections):
-        await service_game.update_game_over(True)
-        await invalidate_game_status_cache()
-        await broadcast_message(
-            message_type="question",
-            content="Игра завершена!",
-            service_game=service_game,
-            service_user=service_user,
-            service_answer=service_answer
-        )
-        return {"message": "Все разделы пройдены"}
+        return await finish_game(service_user)
 
     current_section = sections[current_section_index]
+    question = await question_prefetcher.take(current_section)
+
+    if not question:
+        current_section_index += 1
+        if current_section_index >= len(sections):
+            return await finish_game(service_user)
+        return await switch_section(current_section_index, service_user, service_question)
+
+    await game_timer.cancel()
+    await game_state.update(
+        current_question_id=question.id,
+        current_question=question.question,
+        answer_for_current_question=question.answer,
+        current_question_image=question.question_image,
+        current_answer_image=question.answer_image,
+        timer=False,
+        show_answer=False
+    )
+
+    await broadcast_message(
+        message_type="question",
+        content=question.question,
+        service_user=service_user
+    )
+    execution_time = datetime.now() - start_time
+
     if status.current_question is None:
-        question = await service_question.get_random_question(current_section)
-        
-        if question:
-            game_update = {
-                "current_question": question.question,
-                "answer_for_current_question": question.answer,
-                "current_question_image": question.question_image,
-                "current_answer_image": question.answer_image,
-                "timer_status": False,
-                "show_answer": False
-            }
-            await service_game.update_current_question(**game_update)
-            await invalidate_game_status_cache()
-            
-            await broadcast_message(
-                message_type="question",
-                content=question.question,
-                service_game=service_game,
-                service_user=service_user,
-                service_answer=service_answer
-            )
-            execution_time = datetime.now() - start_time
-            logger.info(f"First question of section shown in {execution_time.total_seconds()} seconds")
-            return {"message": "Первый вопрос раздела показан"}
-        else:
-            current_section_index += 1
-            if current_section_index >= len(sections):
-                await service_game.update_game_over(True)
-                await broadcast_message(
-                    message_type="question",
-                    content="Игра завершена!",
-                    service_game=service_game,
-                    service_user=service_user,
-                    service_answer=service_answer
-                )
-                return {"message": "Все разделы пройдены"}
-
-            await service_game.update_section_index(current_section_index)
-            new_section = sections[current_section_index]
-
-            if not await service_question.has_questions(new_section):
-                await service_question.load_questions_to_redis(new_section)
-
-            await service_game.update_current_question(
-                current_question=None,
-                answer_for_current_question=None,
-                current_question_image="None",
-                current_answer_image="None",
-                timer_status=False,
-                show_answer=False
-            )
-
-            await service_game.update_timer_status(False)
-
-            section_message = f"Раунд {current_section_index + 1}: {new_section}"
-            await broadcast_message(
-                message_type="question",
-                content=section_message,
-                service_game=service_game,
-                service_user=service_user,
-                service_answer=service_answer
-            )
-            
-            return {"message": f"Переход к разделу: {new_section}"}
-    else:
-        question = await service_question.get_random_question(current_section)
-        
-        if question:
-            game_update = {
-                "current_question": question.question,
-                "answer_for_current_question": question.answer,
-                "current_question_image": question.question_image,
-                "current_answer_image": question.answer_image,
-                "timer_status": False,
-                "show_answer": False
-            }
-            await service_game.update_current_question(**game_update)
-            await invalidate_game_status_cache()
-
-            await broadcast_message(
-                message_type="question",
-                content=question.question,
-                service_game=service_game,
-                service_user=service_user,
-                service_answer=service_answer
-            )
-            execution_time = datetime.now() - start_time
-            logger.info(f"Question changed successfully in {execution_time.total_seconds()} seconds")
-            return {"message": "OK"}
-        else:
-            current_section_index += 1
-            if current_section_index >= len(sections):
-                await service_game.update_game_over(True)
-                await broadcast_message(
-                    message_type="question",
-                    content="Игра завершена!",
-                    service_game=service_game,
-                    service_user=service_user,
-                    service_answer=service_answer
-                )
-                return {"message": "Все разделы пройдены"}
-
-            await service_game.update_section_index(current_section_index)
-            new_section = sections[current_section_index]
-            
-            if not await service_question.has_questions(new_section):
-                await service_question.load_questions_to_redis(new_section)
-                
-            await service_game.update_current_question(
-                current_question=None,
-                answer_for_current_question=None,
-                current_question_image="None",
-                current_answer_image="None",
-                timer_status=False,
-                show_answer=False
-            )
-            
-            await service_game.update_timer_status(False)
-            
-            section_message = f"Раунд {current_section_index + 1}: {new_section}"
-            await broadcast_message(
-                message_type="question",
-                content=section_message,
-                service_game=service_game,
-                service_user=service_user,
-                service_answer=service_answer
-            )
-            
-            return {"message": f"Переход к разделу: {new_section}"}
+        logger.info(f"First question of section shown in {execution_time.total_seconds()} seconds")
+        return {"message": "Первый вопрос раздела показан"}
+
+    logger.info(f"Question changed successfully in {execution_time.total_seconds()} seconds")
+    return {"message": "OK"}
 
 @router.post("/admin/next-section")
 async def next_section(
-    service_game: GameService = Depends(get_game_service),
     service_user: UserService = Depends(get_user_service),
-    service_answer: AnswerService = Depends(get_answer_service),
     service_question: QuestionService = Depends(get_question_service)
 ):
     try:
-        status = await get_cached_game_status(service_game)
-        sections = await service_game.get_sections()
+        status = game_state.snapshot
+        sections = status.sections
         current_section_index = status.current_section_index
-        
-        redis = await anext(get_redis())
-        for i in range(current_section_index + 1):
-            section = sections[i]
-            await redis.delete(f"questions:{section}")
-            pattern = f"*{section}*"
-            keys = await redis.keys(pattern)
-            if keys:
-                await redis.delete(*keys)
-        
+
+        question_prefetcher.invalidate()
+        await service_question.clear_questions(*sections[:current_section_index + 1])
+
         next_section_index = current_section_index + 1
-        
+
         if next_section_index >= len(sections):
-            await service_game.update_game_over(True)
-            await broadcast_message(
-                message_type="question",
-                content="Игра завершена! Все разделы пройдены.",
-                service_game=service_game,
-                service_user=service_user,
-                service_answer=service_answer
-            )
-            return {"message": "Все разделы пройдены"}
-        
-        await service_game.update_section_index(next_section_index)
-        new_section = sections[next_section_index]
-        
-        if not await service_question.has_questions(new_section):
-            await service_question.load_questions_to_redis(new_section)
-        
-        await service_game.update_current_question(
-            current_question=None,
-            answer_for_current_question=None,
-            current_question_image="None",
-            current_answer_image="None",
-            timer_status=False,
-            show_answer=False
-        )
-        
-        await service_game.update_timer_status(False)
-        
-        section_message = f"Раунд {next_section_index + 1}: {new_section}"
-        
-        await broadcast_message(
-            message_type="question",
-            content=section_message,
-            service_game=service_game,
-            service_user=service_user,
-            service_answer=service_answer
-        )
-        return {"message": f"Переход к разделу: {new_section}"}
-        
+            return await finish_game(service_user, content="Игра завершена! Все разделы пройдены.")
+
+        return await switch_section(next_section_index, service_user, service_question)
+
     except Exception as e:
         logger.error(f"Ошибка при переключении секции: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-async def handle_disconnect(connection_type: str, identifier: str | int, websocket: WebSocket):
+async def handle_disconnect(connection: Connection):
     try:
-        if connection_type == "player":
-            if identifier in active_players:
-                del active_players[identifier]
-                logger.info(f"🔴 Игрок {identifier} отключился. Осталось игроков: {len(active_players)}")
-        elif connection_type == "spectator":
-            if identifier in active_spectators:
-                del active_spectators[identifier]
-            if identifier in spectator_last_activity:
-                del spectator_last_activity[identifier]
-            logger.info(f"🔴 Зритель {identifier} отключился. Осталось зрителей: {len(active_spectators)}")
+        connection.close()
+        heartbeat.untrack(connection)
+        if hub.remove(connection):
+            if connection.role == PLAYER:
+                logger.info(f"🔴 Игрок {connection.name} отключился. Осталось игроков: {hub.count(PLAYER)}")
+            else:
+                logger.info(f"🔴 Зритель {connection.name} отключился. Осталось зрителей: {hub.count(SPECTATOR)}")
         
         try:
-            await websocket.close()
+            await connection.websocket.close()
         except Exception:
             pass
             
     except Exception as e:
-        logger.error(f"Ошибка при обработке отключения {connection_type} {identifier}: {str(e)}")
+        logger.error(f"Ошибка при обработке отключения {connection.role} {connection.name}: {str(e)}")
 
 @router.websocket("/ws/player")
-async def websocket_player(
-    websocket: WebSocket,
-    service_game: GameService = Depends(get_game_service),
-    service_answer: AnswerService = Depends(get_answer_service)
-):
+async def websocket_player(websocket: WebSocket):
     await websocket.accept()
     connection_id = id(websocket)
-    player_name = None
+    connection = None
 
     logger.info(f"🟢 Новое подключение игрока. ID подключения: {connection_id}")
 
@@ -545,169 +587,183 @@ async def websocket_player(
         player_name = msg["name"]
         reconnect = msg.get("reconnect", False)
 
-        if player_name in active_players:
+        existing = hub.get(PLAYER, player_name)
+        if existing:
             if reconnect:
-                await handle_disconnect("player", player_name, active_players[player_name]['ws'])
+                await handle_disconnect(existing)
                 logger.info(f"🔄 Игрок {player_name} переподключился")
             else:
                 await websocket.close()
                 logger.warning(f"❌ Попытка дублирования игрока {player_name}")
                 return
 
-        active_players[player_name] = {'ws': websocket, 'connection_id': connection_id}
-        logger.info(f"👤 Игрок {player_name} присоединился к игре. Всего игроков: {len(active_players)}")
+        connection = Connection(PLAYER, player_name, websocket, on_drop=handle_disconnect)
+        hub.add(connection)
+        heartbeat.track(connection)
+        logger.info(f"👤 Игрок {player_name} присоединился к игре. Всего игроков: {hub.count(PLAYER)}")
 
-        status = await get_cached_game_status(service_game)
+        status = game_state.snapshot
         initial_message = {
             "type": "question",
             "content": status.current_question or "Ожидайте вопрос",
             "timer": status.timer,
+            "timer_remaining": game_timer.remaining(),
             "show_answer": status.show_answer
         }
-        await websocket.send_json(initial_message)
+        hub.unicast(connection, encode_frame(initial_message))
 
         while True:
-            data = await websocket.receive_text()
+            data = await heartbeat.receive(connection)
+            received_ns = time.monotonic_ns()
             msg = json.loads(data)
 
-            if player_name not in answered_users:
-                logger.info(f"Получен ответ от игрока {player_name}")
-                status = await get_cached_game_status(service_game, force_update=True)
-                await service_answer.add_answer(
-                    question=status.current_question,
-                    username=player_name,
-                    answer=msg['answer']
-                )
-                answered_users.add(player_name)
+            if msg.get("type") == "pong":
+                heartbeat.pong(connection)
+                continue
+
+            status = game_state.snapshot
+            if status.current_question_id is None:
+                # Вопрос еще не показан (до начала игры или на заставке раздела)
+                hub.unicast(connection, REJECTED_ANSWER_FRAME)
+                continue
+
+            if game_timer.is_late() and game_timer.register_late_answer():
+                logger.info(f"⏰ Ответ игрока {player_name} пришел после истечения времени и отклонен")
+                hub.unicast(connection, LATE_ANSWER_FRAME)
+                continue
+
+            if not await answer_gate.claim(status.id, status.current_question_id, player_name):
+                hub.unicast(connection, DUPLICATE_ANSWER_FRAME)
+                continue
+
+            logger.info(f"Получен ответ от игрока {player_name}")
+            if answer_batcher.submit(
+                question=status.current_question,
+                username=player_name,
+                answer=msg['answer'],
+                received_us=game_state.elapsed_us(received_ns),
+                question_id=status.current_question_id,
+                game_id=status.id
+            ):
+                hub.unicast(connection, ACCEPTED_ANSWER_FRAME)
+                await answer_clusters.add(status.current_question_id, player_name, msg['answer'])
+            else:
+                await answer_gate.release(status.id, status.current_question_id, player_name)
+                hub.unicast(connection, REJECTED_ANSWER_FRAME)
 
     except WebSocketDisconnect:
-        if player_name:
-            await handle_disconnect("player", player_name, websocket)
+        if connection:
+            await handle_disconnect(connection)
     except Exception as e:
         logger.error(f"Ошибка в websocket_player: {str(e)}")
-        if player_name:
-            await handle_disconnect("player", player_name, websocket)
+        if connection:
+            await handle_disconnect(connection)
 
 @router.websocket("/ws/spectator")
-async def websocket_spectator(
-    websocket: WebSocket,
-    service_game: GameService = Depends(get_game_service),
-    service_user: UserService = Depends(get_user_service),
-    service_answer: AnswerService = Depends(get_answer_service)
-):
+async def websocket_spectator(websocket: WebSocket):
     await websocket.accept()
     spectator_id = id(websocket)
+    connection = Connection(SPECTATOR, spectator_id, websocket, on_drop=handle_disconnect)
 
     try:
-        active_spectators[spectator_id] = websocket
-        spectator_last_activity[spectator_id] = datetime.now()
+        hub.add(connection)
+        heartbeat.track(connection)
 
-        logger.info(f"🟢 Новое подключение зрителя: ID: {spectator_id}, Всего зрителей: {len(active_spectators)}")
-        status = await get_cached_game_status(service_game)
+        logger.info(f"🟢 Новое подключение зрителя: ID: {spectator_id}, Всего зрителей: {hub.count(SPECTATOR)}")
+        status = game_state.snapshot
         
         message_type = "rating" if status.spectator_display_mode == "rating" else "question"
         content = None if message_type == "rating" else (status.current_question or "Ожидайте следующий вопрос...")
-        
-        temp_spectators = {spectator_id: websocket}
-        original_spectators = active_spectators.copy()
-        
-        try:
-            active_spectators.clear()
-            active_spectators.update(temp_spectators)
-
-            await broadcast_message(
-                message_type=message_type,
-                content=content,
-                service_game=service_game,
-                service_user=service_user,
-                service_answer=service_answer,
-                force_update=False
-            )
-        finally:
-            active_spectators.clear()
-            active_spectators.update(original_spectators)
+
+        if message_type == "rating":
+            await send_rating_snapshot(connection)
+        else:
+            message, _ = await build_message(message_type=message_type, content=content, service_user=None)
+            hub.unicast(connection, encode_frame(message))
 
         while True:
+            data = await heartbeat.receive(connection)
             try:
-                await asyncio.wait_for(websocket.receive_text(), timeout=30)
-                spectator_last_activity[spectator_id] = datetime.now()
-            except asyncio.TimeoutError:
-                if not await is_connection_active(websocket):
-                    logger.warning(f"🔴 Зритель {spectator_id} неактивен, закрываем соединение")
-                    raise WebSocketDisconnect()
+                msg = json.loads(data)
+            except ValueError:
+                continue
+            if not isinstance(msg, dict):
                 continue
 
+            if msg.get("type") == "pong":
+                heartbeat.pong(connection)
+            elif msg.get("type") == "rating_ack":
+                connection.rating_version = msg.get("version")
+                # Клиент пропустил или не смог применить изменения: отправляем снимок целиком
+                if not isinstance(connection.rating_version, int) or connection.rating_version < leaderboard.version:
+                    await send_rating_snapshot(connection)
+            elif msg.get("type") == "rating_sync":
+                await send_rating_snapshot(connection)
+
     except WebSocketDisconnect:
-        await handle_disconnect("spectator", spectator_id, websocket)
+        await handle_disconnect(connection)
     except Exception as e:
         logger.error(f"Ошибка в websocket_spectator: {str(e)}")
-        await handle_disconnect("spectator", spectator_id, websocket)
+        await handle_disconnect(connection)
+
+async def build_message(
+    message_type: str,  # "question" или "rating"
+    content: any,
+    service_user: UserService,
+    force_update: bool = False
+) -> tuple[dict, list[str]]:
+    """Собирает сообщение для рассылки из снимка состояния игры и список ролей получателей"""
+    status = game_state.snapshot
+    current_section = status.current_section
+
+    if message_type == "question":
+        is_section_header = isinstance(content, str) and content.startswith("Раунд ")
+        is_waiting_message = content in ["Ожидайте вопрос", "Ожидайте следующий вопрос...", "Игра завершена!", "Игра сброшена"]
+        
+        message = {
+            "type": "question",
+            "content": content,
+            "section": current_section,
+            "answer": status.answer_for_current_question,
+            "question_image": status.current_question_image,
+            "answer_image": status.current_answer_image,
+            "timer": False if (is_section_header or is_waiting_message) else status.timer,
+            "timer_remaining": None if (is_section_header or is_waiting_message) else game_timer.remaining(),
+            "show_answer": status.show_answer
+        }
+        return message, [PLAYER, SPECTATOR]
+
+    # Рассылка рейтинга публикует новую версию, подключение получает последнюю опубликованную
+    if force_update:
+        update = await leaderboard.publish(service_user)
+    else:
+        update = await leaderboard.snapshot(service_user)
+    return rating_snapshot_message(update), [SPECTATOR]
         
 async def broadcast_message(
     message_type: str,  # "question" или "rating"
     content: any,
-    service_game: GameService,
     service_user: UserService,
-    service_answer: AnswerService,
     force_update: bool = False
 ):
     start_time = datetime.now()
     logger.info(f"""
     🔄 Начало рассылки сообщения:
     - Тип: {message_type}
-    - Активных игроков: {len(active_players)}
-    - Активных зрителей: {len(active_spectators)}
+    - Активных игроков: {hub.count(PLAYER)}
+    - Активных зрителей: {hub.count(SPECTATOR)}
     - Время начала: {start_time.strftime('%H:%M:%S.%f')}
     """)
 
     try:
-        status = await get_cached_game_status(service_game, force_update)
-        sections = await get_cached_sections(service_game, force_update)
-        current_section = sections[status.current_section_index]
-
-        broadcast_tasks = []
-
-        if message_type == "question":
-            is_section_header = isinstance(content, str) and content.startswith("Раунд ")
-            is_waiting_message = content in ["Ожидайте вопрос", "Ожидайте следующий вопрос...", "Игра завершена!", "Игра сброшена"]
-            
-            message = {
-                "type": "question",
-                "content": content,
-                "section": current_section,
-                "answer": status.answer_for_current_question,
-                "question_image": status.current_question_image,
-                "answer_image": status.current_answer_image,
-                "timer": False if (is_section_header or is_waiting_message) else status.timer,
-                "show_answer": status.show_answer
-            }
-
-            for player_name, player_data in active_players.items():
-                broadcast_tasks.append(
-                    asyncio.create_task(player_data['ws'].send_json(message))
-                )
-                logger.debug(f"➡️ Добавлена задача отправки для игрока: {player_name}")
-
-        elif message_type == "rating":
-            players = await get_cached_rating(service_user, force_update)
-            message = {
-                "type": "rating",
-                "content": players,
-                "section": current_section
-            }
-
-        for spectator_id, spectator in list(active_spectators.items()):
-            try:
-                broadcast_tasks.append(
-                    asyncio.create_task(spectator.send_json(message))
-                )
-                logger.debug(f"➡️ Добавлена задача отправки для зрителя ID: {spectator_id}")
-            except Exception as e:
-                logger.error(f"Ошибка при отправке зрителю {spectator_id}: {str(e)}")
-                await handle_disconnect("spectator", spectator_id, spectator)
-
-        if broadcast_tasks:
-            await asyncio.gather(*broadcast_tasks, return_exceptions=True)
+        message, roles = await build_message(
+            message_type=message_type,
+            content=content,
+            service_user=service_user,
+            force_update=force_update
+        )
+        frame = encode_rating_frame(message) if message_type == "rating" else encode_frame(message)
+        report = await publish_frame(message_type, roles, frame)
 
         end_time = datetime.now()
         execution_time = (end_time - start_time).total_seconds()
@@ -716,8 +772,9 @@ async def broadcast_message(
         ✅ Рассылка завершена:
         - Время окончания: {end_time.strftime('%H:%M:%S.%f')}
         - Длительность: {execution_time:.3f} секунд
-        - Отправлено сообщений: {len(broadcast_tasks)}
+        - Доставка: {"через шину Redis" if report is None else f"локально, в очередях {report.queued}, отброшено {report.dropped}"}
         """)
+        return report
 
     except Exception as e:
         logger.error(f"""
@@ -727,23 +784,66 @@ async def broadcast_message(
         """, exc_info=True)
         raise
 
+def deliver_local(message_type: str, roles: list[str], frame: str) -> DeliveryReport:
+    """Раздает готовый кадр подключениям этого воркера"""
+    return hub.multicast(message_type, roles, frame)
+
+async def publish_frame(message_type: str, roles: list[str], frame: str) -> DeliveryReport | None:
+    """Публикует кадр всем воркерам, а без шины или при ее ошибке раздает его локально"""
+    if bus.started:
+        try:
+            await bus.publish(message_type, roles, frame)
+            return None
+        except Exception as e:
+            logger.error(f"Ошибка публикации в шину, рассылаем локально: {str(e)}")
+
+    return deliver_local(message_type, roles, frame)
+
+def apply_remote_state(payload: dict):
+    """Изменения состояния игры, таймера и версии рейтинга, опубликованные другими воркерами"""
+    game_state.apply_remote(payload)
+    game_timer.apply_remote(payload)
+    leaderboard.apply_remote(payload)
+
+def local_presence() -> dict:
+    return {"players": hub.count(PLAYER), "spectators": hub.count(SPECTATOR)}
+
+@router.get("/admin/presence")
+async def get_presence():
+    """Количество игроков и зрителей по всем воркерам"""
+    if not bus.started:
+        return {"workers": 1, **local_presence()}
+    return await bus.presence()
+
+@router.get("/admin/answers/pipeline")
+async def get_answers_pipeline():
+    """Состояние очереди пакетной записи ответов и проверки повторных ответов"""
+    return {**answer_batcher.stats(), "dedup": answer_gate.stats(), "grader": answer_grader.stats(), "clusters": answer_clusters.stats()}
+
+@router.get("/admin/connections")
+async def get_connections():
+    """Статистика подключений этого воркера по ролям и пулов соединений с БД и Redis"""
+    return {**hub.stats(), "heartbeat": heartbeat.stats(), "bus": bus.stats(), "db_pool": get_db().pool_stats(), "redis_pool": get_redis_connection().pool_stats(), "prefetch": question_prefetcher.stats()}
+
+@router.get("/admin/delivery_report")
+async def get_delivery_report():
+    """Отчеты о доставке последних рассылок"""
+    return {"reports": [report.as_dict() for report in reversed(hub.delivery_reports)]}
+
 @router.post("/admin/clear-redis")
 async def clear_redis(
-    service_game: GameService = Depends(get_game_service),
     service_user: UserService = Depends(get_user_service),
-    service_answer: AnswerService = Depends(get_answer_service)
+    service_question: QuestionService = Depends(get_question_service)
 ):
-    redis = await anext(get_redis())
-    
-    await redis.flushall()
-    await service_game.stop_game()
+    await service_question.clear_redis()
+    await game_timer.cancel()
+    await game_state.reset()
+    question_prefetcher.invalidate()
     
     await broadcast_message(
         message_type="question",
         content="Игра сброшена",
-        service_game=service_game,
-        service_user=service_user,
-        service_answer=service_answer
+        service_user=service_user
     )
     
     return {"message": "Redis очищен, игра сброшена"}
\ No newline at end of file
@@ -3,6 +3,7 @@ __all__ = (
     "QuestionRepository",
     "GameRepository",
     "AnswerRepository",
+    "UnitOfWork",
     "LikeRepository",
     "SettingsModelRepository",
     
@@ -11,4 +12,5 @@ __all__ = (
 from .users.UserRepository import UserRepository
 from .questions.QuestionRepository import QuestionRepository
 from .answers.AnswerRepository import AnswerRepository
-from .games.GameRepository import GameRepository
\ No newline at end of file
+from .games.GameRepository import GameRepository
+from .base.unit_of_work import UnitOfWork
@@ -1,20 +1,45 @@
 from ..base.base_repository import BaseRepository
-from models import Answer
+from models import Answer, User
 from sqlalchemy.ext.asyncio import AsyncSession
 from .exceptions.exceptions import AnswerNotFoundException
-from sqlalchemy import delete, select, text
-from typing import List
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.engine import Row
+from schemas.answers import AnswerFilterSchema
+from typing import AsyncIterator, List, Optional
 from datetime import datetime
 import pytz
 
+ANSWERS_PAGE_SIZE = 100
+ANSWERS_EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = (
+    "id", "game_id", "question_id", "user_id", "username", "question",
+    "answer", "answer_at", "created_at", "received_us"
+)
+
+
 class AnswerRepository(BaseRepository[Answer]):
     model: Answer = Answer
     exception: AnswerNotFoundException = AnswerNotFoundException()
 
-    def __init__(self, session: AsyncSession):
-        super().__init__(session=session, model=self.model, exception=self.exception)
+    def __init__(self, session: AsyncSession, autocommit: bool = True):
+        super().__init__(session=session, model=self.model, exception=self.exception, autocommit=autocommit)
+
+    def _user_id(self, username: str):
+        """Id пользователя по имени прямо в INSERT, без отдельного запроса"""
+        return select(User.id).where(User.username == username).scalar_subquery()
 
-    async def add_answer(self, question: str, username: str, answer: str) -> Answer:
+    def _by_game(self, query, game_id: Optional[int]):
+        return query if game_id is None else query.where(self.model.game_id == game_id)
+
+    async def add_answer(
+        self,
+        question: str,
+        username: str,
+        answer: str,
+        received_us: Optional[int] = None,
+        question_id: Optional[int] = None,
+        game_id: Optional[int] = None
+    ) -> Answer:
         moscow_tz = pytz.timezone('Europe/Moscow')
         moscow_time = datetime.now(moscow_tz)
 
@@ -22,55 +47,107 @@ class AnswerRepository(BaseRepository[Answer]):
             question=question,
             username=username,
             answer=answer,
-            answer_at=moscow_time.strftime("%H:%M:%S")
+            answer_at=moscow_time.strftime("%H:%M:%S"),
+            received_us=received_us,
+            question_id=question_id,
+            game_id=game_id,
+            user_id=self._user_id(username)
         )
         self.session.add(new_answer)
-        await self.session.commit()
-        await self.session.close()
+        await self.commit()
+        await self.release()
         return new_answer
 
+    async def add_answers(self, answers: List[dict]) -> int:
+        query = insert(self.model).values([{**answer, "user_id": self._user_id(answer["username"])} for answer in answers])
+        await self.session.execute(query)
+        await self.commit()
+        await self.release()
+        return len(answers)
+
     async def get_all_answers(self) -> List[Answer]:
-        query = select(self.model)
+        query = select(self.model).order_by(self.model.id)
         stmt = await self.session.execute(query)
         res = stmt.scalars().all()
 
-        if not res:
-            raise self.exception
-        
-        await self.session.close()
+        await self.release()
         return res
 
-    async def get_answers_by_question_id(self, question: str) -> List[Answer]:
-        query = select(self.model).where(self.model.question == question)
+    def _filtered(self, query, filters: AnswerFilterSchema):
+        for column in ("game_id", "question_id", "user_id"):
+            value = getattr(filters, column)
+            if value is not None:
+                query = query.where(getattr(self.model, column) == value)
+        if filters.since is not None:
+            query = query.where(self.model.created_at >= filters.since)
+        if filters.until is not None:
+            query = query.where(self.model.created_at < filters.until)
+        return query
+
+    async def get_answers_page(
+        self,
+        filters: AnswerFilterSchema,
+        after: Optional[int] = None,
+        limit: int = ANSWERS_PAGE_SIZE
+    ) -> List[Answer]:
+        """Страница ответов по возрастанию id, начиная после курсора after (keyset, без OFFSET)"""
+        query = self._filtered(select(self.model), filters)
+        if after is not None:
+            query = query.where(self.model.id > after)
+        stmt = await self.session.execute(query.order_by(self.model.id).limit(limit))
+        res = stmt.scalars().all()
+
+        await self.release()
+        return res
+
+    async def stream_answers(
+        self,
+        filters: AnswerFilterSchema,
+        batch_size: int = ANSWERS_EXPORT_BATCH_SIZE
+    ) -> AsyncIterator[list[Row]]:
+        """Ответы пачками по batch_size строк через серверный курсор, без загрузки всей выборки"""
+        columns = [getattr(self.model, column) for column in EXPORT_COLUMNS]
+        query = self._filtered(select(*columns), filters).order_by(self.model.id)
+        result = await self.session.stream(query.execution_options(yield_per=batch_size))
+        try:
+            async for rows in result.partitions():
+                yield rows
+        finally:
+            await result.close()
+            await self.release()
+
+    async def get_answers_by_question_id(self, question_id: int, game_id: Optional[int] = None) -> List[Answer]:
+        query = self._by_game(select(self.model).where(self.model.question_id == question_id), game_id).order_by(self.model.id)
         stmt = await self.session.execute(query)
         res = stmt.scalars().all()
         
-        await self.session.close()
+        await self.release()
         return res
 
-    async def get_answers_by_user_id(self, username: str) -> List[Answer]:
-        query = select(self.model).where(self.model.username == username)
+    async def get_answers_by_user_id(self, user_id: int, game_id: Optional[int] = None) -> List[Answer]:
+        query = self._by_game(select(self.model).where(self.model.user_id == user_id), game_id).order_by(self.model.id)
         stmt = await self.session.execute(query)
         res = stmt.scalars().all()
 
+        await self.release()
         if not res:
             raise self.exception
-        
-        await self.session.close()
         return res
 
-    async def get_answers_by_question_and_user(self, question: str, username: str) -> List[Answer]:
-        query = select(self.model).where(
-            (self.model.question == question) & 
-            (self.model.username == username)
-        )
+    async def get_answers_by_question_and_user(self, question_id: int, user_id: int, game_id: Optional[int] = None) -> List[Answer]:
+        query = self._by_game(
+            select(self.model).where(
+                (self.model.question_id == question_id) &
+                (self.model.user_id == user_id)
+            ),
+            game_id
+        ).order_by(self.model.id)
         stmt = await self.session.execute(query)
         res = stmt.scalars().all()
 
+        await self.release()
         if not res:
             raise self.exception
-        
-        await self.session.close()
         return res
     
     async def reset_table(self) -> dict:
@@ -80,7 +157,7 @@ class AnswerRepository(BaseRepository[Answer]):
         reset_sequence_query = text("ALTER SEQUENCE answers_id_seq RESTART WITH 1")
         await self.session.execute(reset_sequence_query)
 
-        await self.session.commit()
-        await self.session.close()
+        await self.commit()
+        await self.release()
         
         return {"message": "Таблица answers успешно обнулена"}
\ No newline at end of file
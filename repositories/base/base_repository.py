@@ -10,10 +10,22 @@ ExceptionType = TypeVar(name="ExceptionType", bound=BaseException)
 
 class BaseRepository(Generic[ModelType]):
 
-    def __init__(self, session: AsyncSession, model: ModelType, exception: ExceptionType):
+    def __init__(self, session: AsyncSession, model: ModelType, exception: ExceptionType, autocommit: bool = True):
         self.session = session
         self.model = model
         self.exception = exception
+        # В рамках UnitOfWork коммитом и закрытием сессии управляет он сам
+        self.autocommit = autocommit
+
+    async def commit(self) -> None:
+        if self.autocommit:
+            await self.session.commit()
+        else:
+            await self.session.flush()
+
+    async def release(self) -> None:
+        if self.autocommit:
+            await self.session.close()
 
 
     async def list(self) -> list[ModelType]:
@@ -36,7 +48,7 @@ class BaseRepository(Generic[ModelType]):
         
     async def create(self, data: ModelType) -> ModelType:
         self.session.add(data)
-        await self.session.commit()
+        await self.commit()
         await self.session.refresh(data)
 
         return data
@@ -47,7 +59,7 @@ class BaseRepository(Generic[ModelType]):
             raise self.exception
         
         await self.session.delete(res)
-        await self.session.commit()
+        await self.commit()
 
         
 
@@ -0,0 +1,56 @@
+from typing import Optional
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from config import settings
+
+UNLINK_BATCH_SIZE = 500
+
+
+class GameKeyspace:
+    """
+    Ключи игры в Redis под общим префиксом и реестр ключей, которыми она владеет.
+
+    Каждый созданный ключ записывается в множество-реестр, поэтому сброс игры
+    удаляет ровно свои ключи пачками UNLINK (освобождение памяти в фоне),
+    без KEYS и FLUSHALL, не задевая другие игры и сервисы на том же Redis.
+    """
+
+    def __init__(self, redis: Redis, namespace: str = settings.redis.namespace):
+        self.redis = redis
+        self.prefix = f"{namespace}:"
+        self.registry = f"{namespace}:keys"
+
+    def key(self, name: str) -> str:
+        return self.prefix + name
+
+    def track(self, pipe: Pipeline, *keys: str):
+        pipe.sadd(self.registry, *keys)
+
+    async def unlink(self, *keys: str) -> int:
+        removed = 0
+        for start in range(0, len(keys), UNLINK_BATCH_SIZE):
+            batch = keys[start:start + UNLINK_BATCH_SIZE]
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.unlink(*batch)
+                pipe.srem(self.registry, *batch)
+                result = await pipe.execute()
+            removed += result[0]
+        return removed
+
+    async def clear(self, match: Optional[str] = None) -> int:
+        """Удаляет ключи игры из реестра: все вместе с реестром или только по шаблону имени"""
+        removed = 0
+        batch = []
+        pattern = self.key(match) if match else None
+        async for key in self.redis.sscan_iter(self.registry, match=pattern, count=UNLINK_BATCH_SIZE):
+            batch.append(key)
+            if len(batch) >= UNLINK_BATCH_SIZE:
+                removed += await self.unlink(*batch)
+                batch = []
+        if batch:
+            removed += await self.unlink(*batch)
+        if match is None:
+            await self.redis.unlink(self.registry)
+        return removed
@@ -0,0 +1,64 @@
+from functools import cached_property
+from typing import Optional
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..users.UserRepository import UserRepository
+from ..questions.QuestionRepository import QuestionRepository
+from ..answers.AnswerRepository import AnswerRepository
+from ..games.GameRepository import GameRepository
+
+
+class UnitOfWork:
+    """
+    Одна сессия и одна транзакция на все репозитории запроса.
+
+    Репозитории внутри UnitOfWork только делают flush, а коммит выполняется
+    один раз при выходе из контекста (или явно через commit()).
+    При исключении транзакция откатывается целиком.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, redis: Optional[Redis] = None):
+        self.session_factory = session_factory
+        self.redis = redis
+        self.session: Optional[AsyncSession] = None
+
+    async def __aenter__(self) -> "UnitOfWork":
+        self.session = self.session_factory()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                await self.commit()
+            else:
+                await self.rollback()
+        finally:
+            await self.session.close()
+
+    async def commit(self):
+        try:
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+
+    async def rollback(self):
+        await self.session.rollback()
+
+    @cached_property
+    def users(self) -> UserRepository:
+        return UserRepository(session=self.session, autocommit=False)
+
+    @cached_property
+    def questions(self) -> QuestionRepository:
+        return QuestionRepository(session=self.session, redis=self.redis, autocommit=False)
+
+    @cached_property
+    def answers(self) -> AnswerRepository:
+        return AnswerRepository(session=self.session, autocommit=False)
+
+    @cached_property
+    def games(self) -> GameRepository:
+        return GameRepository(session=self.session, autocommit=False)
@@ -1,6 +1,8 @@
-import json
+import random
+
 from typing import List, Optional
 from ..base.base_repository import BaseRepository
+from ..base.keyspace import GameKeyspace
 from models import Question
 from sqlalchemy.ext.asyncio import AsyncSession
 from .exceptions.exceptions import UserNotFoundException
@@ -8,14 +10,35 @@ from sqlalchemy import select, delete, text
 from schemas.questions import QuestionSchema
 
 from redis.asyncio import Redis
+from redis.exceptions import WatchError
+
+# Колода раздела: список еще не показанных вопросов (голова - следующий),
+# показанные вопросы уходят в отдельный список, последний показанный - в голове.
+# Следующий вопрос может быть заранее перенесен из колоды в список подготовленного
+# (не больше одного) и считается ее головой.
+# Имена ключей даны относительно префикса игры (GameKeyspace)
+DECK_KEY = "deck:{section}"
+SHOWN_KEY = "deck:{section}:shown"
+STAGED_KEY = "deck:{section}:staged"
+DECK_SEEDS_KEY = "deck:seeds"
 
 class QuestionRepository(BaseRepository[Question]):
     model: Question = Question
     exception: UserNotFoundException = UserNotFoundException()
 
-    def __init__(self, session: AsyncSession, redis: Redis):
+    def __init__(self, session: AsyncSession, redis: Redis, autocommit: bool = True):
         self.redis = redis
-        super().__init__(session=session, model=self.model, exception=self.exception)
+        self.keyspace = GameKeyspace(redis)
+        super().__init__(session=session, model=self.model, exception=self.exception, autocommit=autocommit)
+
+    def _deck_key(self, section: str) -> str:
+        return self.keyspace.key(DECK_KEY.format(section=section))
+
+    def _shown_key(self, section: str) -> str:
+        return self.keyspace.key(SHOWN_KEY.format(section=section))
+
+    def _staged_key(self, section: str) -> str:
+        return self.keyspace.key(STAGED_KEY.format(section=section))
 
     async def add_question_from_list(self, questions_data: list[dict]) -> Question:
         try:
@@ -28,7 +51,7 @@ class QuestionRepository(BaseRepository[Question]):
                     answer_image=question_data.get("answer_image")
                 )
                 self.session.add(new_question)
-            await self.session.commit()
+            await self.commit()
             return {"ok": "Вопросы успешно добавлены"}
         except Exception as e:
             return {"error": f"Ошибка при добавлении вопроса: {str(e)}"}
@@ -81,7 +104,7 @@ class QuestionRepository(BaseRepository[Question]):
             if self.session.bind.dialect.name == 'postgresql':
                 await self.session.execute(text(f"ALTER SEQUENCE {self.model.__tablename__}_id_seq RESTART WITH 1"))
             
-            await self.session.commit()
+            await self.commit()
         except Exception as e:
             return {"error": f"Ошибка при удалении таблицы: {str(e)}"}
         return {"ok": "Таблица с вопросами удалена"}
@@ -98,45 +121,184 @@ class QuestionRepository(BaseRepository[Question]):
 
             delete_query = delete(self.model).where(self.model.question == question)
             await self.session.execute(delete_query)
-            await self.session.commit()
+            await self.commit()
         except Exception as e:
             return {"error": f"Ошибка при удалении вопроса: {str(e)}"}
         
         return {"message": "Вопрос успешно удален"}
     
-    async def load_questions_to_redis(self, section: str):
+    async def load_questions_to_redis(self, section: str, seed: Optional[int] = None):
+        return await self.load_decks(sections=[section], seed=seed)
+
+    async def load_decks(self, sections: list[str], seed: Optional[int] = None) -> dict[str, int]:
+        """
+        Колоды всех разделов: один SELECT и одна транзакция MULTI.
+
+        Вопросы раздела упорядочиваются по id и перемешиваются генератором
+        с записанным seed, поэтому порядок колоды можно воспроизвести.
+        """
         try:
-            await self.redis.delete(section)
-            query = select(self.model).where(self.model.section == section)
+            query = select(self.model).where(self.model.section.in_(sections)).order_by(self.model.id)
             result = await self.session.execute(query)
-            questions = result.scalars().all()
-            
-            for question in questions:
-                question_data = QuestionSchema.from_orm(question).dict()
-                await self.redis.sadd(section, json.dumps(question_data, ensure_ascii=False))
-        except Exception as e:
-            {"error": f"Ошибка при загрузке вопроса в redis: {str(e)}"}
 
-    async def get_random_question(self, section: str) -> Optional[QuestionSchema]:
-        try:
-            question_json = await self.redis.spop(section)
-            if question_json:
-                return QuestionSchema(**json.loads(question_json.decode('utf-8')))
+            decks = {section: [] for section in sections}
+            for question in result.scalars():
+                decks[question.section].append(QuestionSchema.model_validate(question).model_dump_json())
+
+            seeds = {}
+            for section, members in decks.items():
+                seeds[section] = seed if seed is not None else random.getrandbits(32)
+                random.Random(seeds[section]).shuffle(members)
+
+            async with self.redis.pipeline(transaction=True) as pipe:
+                for section, members in decks.items():
+                    pipe.delete(self._deck_key(section), self._shown_key(section), self._staged_key(section))
+                    if members:
+                        pipe.rpush(self._deck_key(section), *members)
+                    self.keyspace.track(pipe, self._deck_key(section), self._shown_key(section), self._staged_key(section))
+                pipe.hset(self.keyspace.key(DECK_SEEDS_KEY), mapping=seeds)
+                self.keyspace.track(pipe, self.keyspace.key(DECK_SEEDS_KEY))
+                await pipe.execute()
+
+            return {section: len(members) for section, members in decks.items()}
         except Exception as e:
-            return {"error": f"ошибка при получении случайного вопроса из redis: {str(e)}"}
-        
+            return {"error": f"Ошибка при загрузке вопросов в redis: {str(e)}"}
+
+    async def pop_question(self, section: str) -> Optional[QuestionSchema]:
+        """Следующий вопрос (подготовленный или голова колоды) переносится в список показанных"""
+        staged_key = self._staged_key(section)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(staged_key)
+                    source = staged_key if await pipe.llen(staged_key) else self._deck_key(section)
+                    pipe.multi()
+                    pipe.lmove(source, self._shown_key(section), "LEFT", "LEFT")
+                    question_json, = await pipe.execute()
+                    break
+                except WatchError:
+                    continue
+        if question_json:
+            return QuestionSchema.model_validate_json(question_json)
+        return None
+
+    async def reserve_question(self, section: str) -> Optional[bytes]:
+        """Переносит голову колоды в список подготовленного, если он пуст, и возвращает подготовленный вопрос"""
+        staged_key = self._staged_key(section)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(staged_key)
+                    staged = await pipe.lindex(staged_key, 0)
+                    if staged is not None:
+                        await pipe.unwatch()
+                        return staged
+                    pipe.multi()
+                    pipe.lmove(self._deck_key(section), staged_key, "LEFT", "LEFT")
+                    self.keyspace.track(pipe, staged_key)
+                    staged, _ = await pipe.execute()
+                    return staged
+                except WatchError:
+                    continue
+
+    async def claim_question(self, section: str) -> Optional[bytes]:
+        """Переносит подготовленный вопрос в показанные одной командой; JSON не разбирается"""
+        return await self.redis.lmove(self._staged_key(section), self._shown_key(section), "LEFT", "LEFT")
+
+    async def peek_questions(self, section: str, count: int) -> list[QuestionSchema]:
+        # lrange(0, -1) вернул бы всю колоду
+        if count <= 0:
+            return []
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.lrange(self._staged_key(section), 0, 0)
+            pipe.lrange(self._deck_key(section), 0, count - 1)
+            staged, members = await pipe.execute()
+        return [QuestionSchema.model_validate_json(member) for member in (staged + members)[:count]]
+
+    async def return_question(self, section: str) -> Optional[QuestionSchema]:
+        """Возвращает последний показанный вопрос в голову колоды"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            # Подготовленный вопрос идет после возвращенного, поэтому сначала возвращается он
+            pipe.lmove(self._staged_key(section), self._deck_key(section), "LEFT", "LEFT")
+            pipe.lmove(self._shown_key(section), self._deck_key(section), "LEFT", "LEFT")
+            _, question_json = await pipe.execute()
+        if question_json:
+            return QuestionSchema.model_validate_json(question_json)
+        return None
+
+    async def restart_section(self, section: str) -> int:
+        """Возвращает все показанные вопросы в колоду в исходном порядке, без чтения из БД"""
+        shown_key, deck_key, staged_key = self._shown_key(section), self._deck_key(section), self._staged_key(section)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    # Число переносов и сами переносы - под WATCH, иначе параллельное
+                    # извлечение между LLEN и MULTI сдвинет колоду не на ту величину
+                    await pipe.watch(shown_key, deck_key, staged_key)
+                    shown = await pipe.llen(shown_key)
+                    pipe.multi()
+                    pipe.lmove(staged_key, deck_key, "LEFT", "LEFT")
+                    for _ in range(shown):
+                        pipe.lmove(shown_key, deck_key, "LEFT", "LEFT")
+                    pipe.llen(deck_key)
+                    result = await pipe.execute()
+                    return result[-1]
+                except WatchError:
+                    continue
 
     async def has_questions(self, section: str) -> bool:
-        return await self.redis.scard(section) > 0 
-    
-    async def clear_questions(self, section: str):
-        await self.redis.delete(f"questions:{section}")
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.llen(self._deck_key(section))
+            pipe.llen(self._staged_key(section))
+            deck, staged = await pipe.execute()
+        return deck + staged > 0
+
+    async def missing_sections(self, sections: list[str]) -> list[str]:
+        """Разделы с пустой колодой, проверка всех разделов за один запрос к Redis"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for section in sections:
+                pipe.llen(self._deck_key(section))
+                pipe.llen(self._staged_key(section))
+            sizes = await pipe.execute()
+        return [section for i, section in enumerate(sections) if not sizes[2 * i] + sizes[2 * i + 1]]
+
+    async def deck_stats(self, sections: list[str]) -> dict[str, dict]:
+        """Остаток, число показанных и seed по всем разделам за один запрос к Redis"""
+        if not sections:
+            return {}
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for section in sections:
+                pipe.llen(self._deck_key(section))
+                pipe.llen(self._staged_key(section))
+                pipe.llen(self._shown_key(section))
+            pipe.hmget(self.keyspace.key(DECK_SEEDS_KEY), sections)
+            result = await pipe.execute()
+
+        seeds = result[-1]
+        return {
+            section: {
+                "remaining": result[3 * i] + result[3 * i + 1],
+                "shown": result[3 * i + 2],
+                "seed": int(seeds[i]) if seeds[i] is not None else None
+            }
+            for i, section in enumerate(sections)
+        }
+
+    async def clear_questions(self, *sections: str) -> int:
+        """Удаляет колоды разделов вместе со списками показанных и подготовленных вопросов"""
+        keys = [
+            key
+            for section in sections
+            for key in (self._deck_key(section), self._shown_key(section), self._staged_key(section))
+        ]
+        if not keys:
+            return 0
+        return await self.keyspace.unlink(*keys)
 
     async def clear_redis(self):
         try:
-            await self.redis.flushall()
-            return {"message": "Redis успешно очищен"}
+            removed = await self.keyspace.clear()
+            return {"message": f"Ключи игры в Redis удалены: {removed}"}
         except Exception as e:
             return {"error": f"Ошибка при очистке Redis: {str(e)}"}
-        
-    
\ No newline at end of file
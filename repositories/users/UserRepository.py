@@ -2,14 +2,14 @@ from ..base.base_repository import BaseRepository
 from models import User
 from sqlalchemy.ext.asyncio import AsyncSession
 from .exceptions.exceptions import UserNotFoundException, UsersNotFoundException, UserExistsException, UserNotExistsException
-from sqlalchemy import select, delete, text
+from sqlalchemy import select, delete, text, update, case, func
 
 class UserRepository(BaseRepository[User]):
     model: User = User
     exception: UserNotFoundException = UserNotFoundException()
           
-    def __init__(self, session: AsyncSession):
-        super().__init__(session=session, model=self.model, exception=self.exception)
+    def __init__(self, session: AsyncSession, autocommit: bool = True):
+        super().__init__(session=session, model=self.model, exception=self.exception, autocommit=autocommit)
 
     async def registration(self, hash_password: bytes, username: str) -> User:
         query = select(self.model).where(self.model.username == username)
@@ -25,7 +25,7 @@ class UserRepository(BaseRepository[User]):
         }
         new_user = User(**new_user_dict)
         self.session.add(new_user)
-        await self.session.commit()
+        await self.commit()
 
         return new_user
     
@@ -71,14 +71,19 @@ class UserRepository(BaseRepository[User]):
 
         return list(res)
     
-    async def add_score_to_user(self, username: str, points: int) -> User:
-        query = select(self.model).where(self.model.username == username)
+    async def add_score_to_user(self, username: str, points: int) -> dict:
+        # Прибавляем в самой БД, чтобы параллельные начисления не затирали друг друга
+        query = (
+            update(self.model)
+            .where(self.model.username == username)
+            .values(score=func.coalesce(self.model.score, 0) + points)
+            .returning(self.model.id, self.model.username, self.model.score)
+        )
         stmt = await self.session.execute(query)
-        user = stmt.scalars().first()
+        user = stmt.first()
         if not user:
             raise self.exception
-        user.score += points
-        await self.session.commit()
+        await self.commit()
 
         return {
                 "id": user.id,
@@ -86,6 +91,27 @@ class UserRepository(BaseRepository[User]):
                 "score": user.score
             }
 
+    async def add_scores_to_users(self, scores: dict[str, int]) -> list[dict]:
+        """Начисляет очки нескольким пользователям одним UPDATE; если кого-то нет, не меняет никого"""
+        if not scores:
+            return []
+
+        query = (
+            update(self.model)
+            .where(self.model.username.in_(scores))
+            .values(score=func.coalesce(self.model.score, 0) + case(scores, value=self.model.username, else_=0))
+            .returning(self.model.id, self.model.username, self.model.score)
+        )
+        stmt = await self.session.execute(query)
+        users = stmt.all()
+
+        missing = set(scores) - {user.username for user in users}
+        if missing:
+            raise UserNotFoundException(f"Пользователи не найдены: {', '.join(sorted(missing))}")
+        await self.commit()
+
+        return [{"id": user.id, "username": user.username, "score": user.score} for user in users]
+
     async def delete_user_by_username(self, username: str) -> User:
         query = select(self.model).where(self.model.username == username)
         stmt = await self.session.execute(query)
@@ -96,7 +122,7 @@ class UserRepository(BaseRepository[User]):
         
         delete_query = delete(self.model).where(self.model.username == username)
         await self.session.execute(delete_query)
-        await self.session.commit()
+        await self.commit()
 
         return {"message": "Пользователь успешно удален"}
     
@@ -117,7 +143,7 @@ class UserRepository(BaseRepository[User]):
         reset_sequence_query = text("ALTER SEQUENCE users_id_seq RESTART WITH 1")
         await self.session.execute(reset_sequence_query)
 
-        await self.session.commit()
+        await self.commit()
 
         return {"message": "Таблица users успешно обнулена"}
 
@@ -1,11 +1,21 @@
+from datetime import datetime
+from typing import Optional
+
 from pydantic import BaseModel, Field
 
+from config import settings
+
 class AnswerSchema(BaseModel):
     id: int = Field(description="Уникальный идентификатор ответа")
     question: str = Field(description="вопрос, на который дан ответ")
     username: str = Field(description="username пользователя, который оставил ответ (если есть)")
     answer: str = Field(description="Текст ответа")
+    question_id: Optional[int] = Field(default=None, description="ID вопроса")
+    game_id: Optional[int] = Field(default=None, description="ID игры")
+    user_id: Optional[int] = Field(default=None, description="ID пользователя")
     answer_at: str = Field(description="Дата и время создания ответа")
+    created_at: Optional[datetime] = Field(default=None, description="Время записи ответа в БД")
+    received_us: Optional[int] = Field(default=None, description="Через сколько микросекунд после показа вопроса сервер получил ответ")
 
     class Config:
         from_attributes = True
@@ -15,6 +25,36 @@ class AnswerSchema(BaseModel):
                 "question": "Вопрос",
                 "username": "Username",
                 "answer": "Это пример ответа на вопрос.",
-                "answer_at": "12:00:00"
+                "question_id": 1,
+                "game_id": 1,
+                "user_id": 1,
+                "answer_at": "12:00:00",
+                "created_at": "2025-05-01T12:00:00+03:00",
+                "received_us": 5130042
             }
-        }
\ No newline at end of file
+        }
+
+
+class GradeApplySchema(BaseModel):
+    usernames: Optional[list[str]] = Field(default=None, description="Кому начислить очки; по умолчанию всем, чьи ответы признаны правильными")
+    points: int = Field(default=1, description="Сколько очков начислить")
+    speed_bonus: bool = Field(default=False, description="Добавить бонус за скорость по времени получения ответа")
+    bonus: int = Field(default=settings.game.speed_bonus_points, description="Бонус за мгновенный ответ, убывает до нуля к концу окна")
+    window: int = Field(default=settings.game.speed_bonus_window, description="Окно бонуса за скорость в секундах")
+
+
+class ClusterAcceptSchema(GradeApplySchema):
+    clusters: list[str] = Field(description="Нормализованные тексты принятых групп ответов")
+
+
+class AnswerFilterSchema(BaseModel):
+    game_id: Optional[int] = Field(default=None, description="ID игры")
+    question_id: Optional[int] = Field(default=None, description="ID вопроса")
+    user_id: Optional[int] = Field(default=None, description="ID пользователя")
+    since: Optional[datetime] = Field(default=None, description="Ответы, записанные не раньше этого времени")
+    until: Optional[datetime] = Field(default=None, description="Ответы, записанные раньше этого времени")
+
+
+class AnswerPageSchema(BaseModel):
+    items: list[AnswerSchema]
+    next_cursor: Optional[int] = Field(default=None, description="Передайте как after, чтобы получить следующую страницу")
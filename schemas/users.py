@@ -13,3 +13,7 @@ class UserLoginSchema(BaseModel):
 class UserByName(BaseModel):
     username: str
     score: int
+
+
+class UserScoresSchema(BaseModel):
+    scores: dict[str, int]
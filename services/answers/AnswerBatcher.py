@@ -0,0 +1,218 @@
+import asyncio
+import time
+
+from datetime import datetime
+from typing import Optional
+
+import pytz
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from repositories import UnitOfWork
+from services.answers.AnswerService import AnswerService
+from config.logger import setup_logging
+
+logger = setup_logging()
+
+ANSWER_BATCH_SIZE = 200
+ANSWER_FLUSH_INTERVAL = 0.05
+ANSWER_QUEUE_SIZE = 10_000
+ANSWER_FLUSH_RETRIES = 3
+ANSWER_RETRY_DELAY = 0.2
+
+MOSCOW_TZ = pytz.timezone('Europe/Moscow')
+
+_STOP = object()
+
+
+class AnswerBatcher:
+    """
+    Очередь приема ответов игроков с пакетной записью в таблицу answers.
+
+    WebSocket игрока только кладет ответ в очередь, а фоновая задача
+    собирает пачку до ANSWER_BATCH_SIZE строк или до ANSWER_FLUSH_INTERVAL
+    секунд и записывает ее одним INSERT ... VALUES и одним коммитом.
+    При остановке приложения очередь дописывается до конца.
+
+    Игрок уже получил подтверждение, поэтому пачка при ошибке не
+    выбрасывается: сбой соединения повторяется с паузой, а если пачку
+    отвергла сама БД (ограничения, неверные данные), строки пишутся по
+    одной и теряется только та, что не проходит.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = ANSWER_BATCH_SIZE,
+        flush_interval: float = ANSWER_FLUSH_INTERVAL,
+        maxsize: int = ANSWER_QUEUE_SIZE
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.session_factory: Optional[async_sessionmaker] = None
+        self._task: Optional[asyncio.Task] = None
+        self._clock_second = 0
+        self._clock_text = ""
+
+        self.accepted = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.failed = 0
+        self.retries = 0
+        self.split = 0
+        self.batches = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def start(self, session_factory: async_sessionmaker):
+        self.session_factory = session_factory
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        await self.queue.put(_STOP)
+        await self._task
+        self._task = None
+        logger.info(f"💾 Очередь ответов дописана при остановке, всего записано: {self.flushed}")
+
+    def _answer_at(self) -> str:
+        """Московское время ответа HH:MM:SS, форматируется не чаще раза в секунду"""
+        second = int(time.time())
+        if second != self._clock_second:
+            self._clock_second = second
+            self._clock_text = datetime.fromtimestamp(second, MOSCOW_TZ).strftime("%H:%M:%S")
+        return self._clock_text
+
+    def submit(
+        self,
+        question: str,
+        username: str,
+        answer: str,
+        received_us: Optional[int] = None,
+        question_id: Optional[int] = None,
+        game_id: Optional[int] = None
+    ) -> bool:
+        if not question:
+            self.rejected += 1
+            logger.warning(f"Ответ игрока {username} пришел, когда вопрос не показан, не принят")
+            return False
+
+        row = {
+            "question": question,
+            "question_id": question_id,
+            "game_id": game_id,
+            "username": username,
+            "answer": answer,
+            "answer_at": self._answer_at(),
+            "received_us": received_us
+        }
+        try:
+            self.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            logger.error(f"Очередь ответов переполнена, ответ игрока {username} не принят")
+            return False
+
+        self.accepted += 1
+        return True
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await self.queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+        # Дописываем все, что успело накопиться после сигнала остановки
+        while not self.queue.empty():
+            batch = []
+            while len(batch) < self.batch_size and not self.queue.empty():
+                item = self.queue.get_nowait()
+                if item is not _STOP:
+                    batch.append(item)
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch: list[dict]):
+        start_time = time.perf_counter()
+        written = await self._write(batch)
+
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        self.flushed += written
+        self.failed += len(batch) - written
+        self.batches += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self.total_flush_ms += elapsed_ms
+
+    async def _write(self, batch: list[dict]) -> int:
+        """Записывает пачку и возвращает число записанных строк"""
+        for attempt in range(1, ANSWER_FLUSH_RETRIES + 1):
+            try:
+                async with UnitOfWork(session_factory=self.session_factory) as uow:
+                    await AnswerService(repository=uow.answers).add_answers(batch)
+                return len(batch)
+            except (IntegrityError, DataError) as e:
+                if len(batch) == 1:
+                    logger.error(f"Ответ игрока {batch[0]['username']} отвергнут БД и не записан: {str(e)}")
+                    return 0
+                # Пачку отвергла одна из строк: пишем по одной, чтобы не потерять остальные
+                self.split += 1
+                logger.warning(f"БД отвергла пачку из {len(batch)} ответов, записываем по одному: {str(e)}")
+                written = 0
+                for row in batch:
+                    written += await self._write([row])
+                return written
+            except Exception as e:
+                if attempt == ANSWER_FLUSH_RETRIES:
+                    usernames = ", ".join(row["username"] for row in batch)
+                    logger.error(f"Не удалось записать {len(batch)} ответов после {attempt} попыток ({usernames}): {str(e)}")
+                    return 0
+                self.retries += 1
+                delay = ANSWER_RETRY_DELAY * attempt
+                logger.warning(f"Ошибка при пакетной записи {len(batch)} ответов, повтор через {delay} с: {str(e)}")
+                await asyncio.sleep(delay)
+        return 0
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "split": self.split,
+            "batches": self.batches,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "avg_flush_ms": round(self.total_flush_ms / self.batches, 2) if self.batches else 0.0
+        }
+
+
+answer_batcher = AnswerBatcher()
@@ -0,0 +1,159 @@
+import hashlib
+
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from repositories.base.keyspace import GameKeyspace
+from services.answers.AnswerGate import ANSWER_CLAIM_TTL
+from services.answers.AnswerGrader import normalize
+from config.logger import setup_logging
+
+logger = setup_logging()
+
+CLUSTERS_KEY = "clusters:{question_id}"
+CLUSTER_TEAMS_KEY = "clusters:{question_id}:teams:{digest}"
+CLUSTER_SAMPLES_KEY = "clusters:{question_id}:samples"
+CLUSTER_ACCEPTED_KEY = "clusters:{question_id}:accepted"
+CLUSTER_TOTAL_KEY = "clusters:{question_id}:total"
+CLUSTERS_LIMIT = 50
+CLUSTER_TEAMS_LIMIT = 20
+
+
+class AnswerClusters:
+    """
+    Ответы на текущий вопрос, сгруппированные по нормализованному тексту.
+
+    Индекс обновляется при приеме каждого ответа одним конвейером Redis:
+    счетчик группы в ZSET, команда в SET группы и первый исходный текст
+    группы как образец. Поэтому обзор для ведущего - это top-N групп без
+    чтения всех ответов из БД, и его размер зависит от числа разных
+    ответов, а не от числа команд. Индекс общий для всех воркеров.
+    """
+
+    def __init__(self, ttl: int = ANSWER_CLAIM_TTL):
+        self.ttl = ttl
+        self.keyspace: Optional[GameKeyspace] = None
+        self.indexed = 0
+        self.errors = 0
+
+    def start(self, redis: Redis):
+        self.keyspace = GameKeyspace(redis)
+
+    @property
+    def redis(self) -> Redis:
+        return self.keyspace.redis
+
+    def _teams_key(self, question_id: int, text: str) -> str:
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+        return self.keyspace.key(CLUSTER_TEAMS_KEY.format(question_id=question_id, digest=digest))
+
+    def _keys(self, question_id: int) -> tuple[str, str, str, str]:
+        return tuple(
+            self.keyspace.key(key.format(question_id=question_id))
+            for key in (CLUSTERS_KEY, CLUSTER_SAMPLES_KEY, CLUSTER_ACCEPTED_KEY, CLUSTER_TOTAL_KEY)
+        )
+
+    async def add(self, question_id: Optional[int], username: str, answer: str):
+        if question_id is None:
+            return
+        text = " ".join(normalize(answer))
+        clusters, samples, _, total = self._keys(question_id)
+        teams = self._teams_key(question_id, text)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.zincrby(clusters, 1, text)
+                pipe.sadd(teams, username)
+                pipe.hsetnx(samples, text, answer)
+                pipe.incr(total)
+                for key in (clusters, teams, samples, total):
+                    pipe.expire(key, self.ttl)
+                self.keyspace.track(pipe, clusters, teams, samples, total)
+                await pipe.execute()
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Ошибка при группировке ответа игрока {username}: {str(e)}")
+            return
+        self.indexed += 1
+
+    async def clusters(
+        self,
+        question_id: Optional[int],
+        limit: int = CLUSTERS_LIMIT,
+        teams_limit: int = CLUSTER_TEAMS_LIMIT
+    ) -> tuple[int, list[dict]]:
+        """Число ответов и самые частые группы: текст, образец, число команд и до teams_limit команд группы"""
+        if question_id is None:
+            return 0, []
+        clusters, samples, accepted, total = self._keys(question_id)
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zrevrange(clusters, 0, limit - 1, withscores=True)
+            pipe.smembers(accepted)
+            pipe.get(total)
+            entries, accepted_texts, answers_count = await pipe.execute()
+
+        texts = [member.decode("utf-8") for member, _ in entries]
+        if not texts:
+            return 0, []
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hmget(samples, texts)
+            for text in texts:
+                pipe.srandmember(self._teams_key(question_id, text), teams_limit)
+            results = await pipe.execute()
+
+        accepted_texts = {text.decode("utf-8") for text in accepted_texts}
+        return int(answers_count or 0), [
+            {
+                "text": text,
+                "sample": sample.decode("utf-8") if sample is not None else text,
+                "count": int(count),
+                "teams": sorted(team.decode("utf-8") for team in teams),
+                "accepted": text in accepted_texts
+            }
+            for text, (_, count), sample, teams in zip(texts, entries, results[0], results[1:])
+        ]
+
+    async def teams(self, question_id: Optional[int], texts: list[str]) -> list[str]:
+        """Все команды из указанных групп"""
+        if question_id is None or not texts:
+            return []
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for text in texts:
+                pipe.smembers(self._teams_key(question_id, text))
+            results = await pipe.execute()
+        return sorted({team.decode("utf-8") for members in results for team in members})
+
+    async def mark_accepted(self, question_id: Optional[int], texts: list[str]) -> list[str]:
+        """Отмечает группы принятыми и возвращает только те, что еще не были приняты (SADD атомарен)"""
+        if question_id is None or not texts:
+            return []
+        _, _, accepted, _ = self._keys(question_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for text in texts:
+                pipe.sadd(accepted, text)
+            pipe.expire(accepted, self.ttl)
+            self.keyspace.track(pipe, accepted)
+            results = await pipe.execute()
+        return [text for text, added in zip(texts, results) if added]
+
+    async def unmark_accepted(self, question_id: Optional[int], texts: list[str]):
+        """Снимает отметку, если начислить очки не удалось"""
+        if question_id is None or not texts:
+            return
+        _, _, accepted, _ = self._keys(question_id)
+        try:
+            await self.redis.srem(accepted, *texts)
+        except Exception as e:
+            logger.error(f"Ошибка при снятии отметки принятых групп: {str(e)}")
+
+    async def clear(self) -> int:
+        """Сбрасывает группы всех вопросов, например при новом запуске игры"""
+        return await self.keyspace.clear(match="clusters:*")
+
+    def stats(self) -> dict:
+        return {"indexed": self.indexed, "errors": self.errors}
+
+
+answer_clusters = AnswerClusters()
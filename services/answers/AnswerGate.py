@@ -0,0 +1,88 @@
+import time
+
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from repositories.base.keyspace import GameKeyspace
+from config.logger import setup_logging
+
+logger = setup_logging()
+
+ANSWER_CLAIM_TTL = 6 * 60 * 60
+ANSWERED_KEY = "answered:{game_id}:{question_id}:{username}"
+
+
+class AnswerGate:
+    """
+    Прием только первого ответа игрока на вопрос, общий для всех воркеров.
+
+    Ответ занимает ключ (игра, id вопроса, игрок) через SET NX EX: кто успел
+    первым, тот и принят, независимо от того, к какому воркеру подключен
+    игрок. Ключ регистрируется в GameKeyspace в том же конвейере, так что
+    проверка - один round trip к Redis. Если Redis недоступен, ответ
+    принимается: лучше дубль, чем потерянный ответ.
+    """
+
+    def __init__(self, ttl: int = ANSWER_CLAIM_TTL):
+        self.ttl = ttl
+        self.keyspace: Optional[GameKeyspace] = None
+
+        self.accepted = 0
+        self.duplicates = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def start(self, redis: Redis):
+        self.keyspace = GameKeyspace(redis)
+
+    def _key(self, game_id: Optional[int], question_id: int, username: str) -> str:
+        return self.keyspace.key(ANSWERED_KEY.format(game_id=game_id, question_id=question_id, username=username))
+
+    async def claim(self, game_id: Optional[int], question_id: int, username: str) -> bool:
+        key = self._key(game_id, question_id, username)
+        start_time = time.perf_counter()
+        try:
+            async with self.keyspace.redis.pipeline(transaction=False) as pipe:
+                pipe.set(key, 1, nx=True, ex=self.ttl)
+                self.keyspace.track(pipe, key)
+                first, _ = await pipe.execute()
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Ошибка проверки повторного ответа игрока {username}, ответ принят: {str(e)}")
+            return True
+
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+        if first:
+            self.accepted += 1
+            return True
+        self.duplicates += 1
+        return False
+
+    async def release(self, game_id: Optional[int], question_id: int, username: str):
+        """Снимает отметку, если принятый ответ так и не удалось поставить в очередь"""
+        try:
+            await self.keyspace.unlink(self._key(game_id, question_id, username))
+        except Exception as e:
+            logger.error(f"Ошибка при снятии отметки ответа игрока {username}: {str(e)}")
+
+    async def clear(self) -> int:
+        """Снимает отметки всех ответов, например при новом запуске игры"""
+        return await self.keyspace.clear(match=ANSWERED_KEY.format(game_id="*", question_id="*", username="*"))
+
+    def stats(self) -> dict:
+        checks = self.accepted + self.duplicates
+        return {
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+            "avg_check_ms": round(self.total_ms / checks, 3) if checks else 0.0,
+            "max_check_ms": round(self.max_ms, 3)
+        }
+
+
+answer_gate = AnswerGate()
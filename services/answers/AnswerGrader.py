@@ -0,0 +1,215 @@
+import re
+import time
+
+from typing import Iterable, Optional
+
+ACCEPT_THRESHOLD = 0.8
+TOKEN_MATCH_THRESHOLD = 0.75
+# Вес полноты при пересечении токенов (F2): лишние слова в ответе штрафуются слабее, чем пропущенные
+RECALL_WEIGHT = 4
+VARIANTS_PATTERN = re.compile(r"[/;|]|\s+или\s+")
+
+STOP_WORDS = frozenset((
+    "а", "и", "в", "во", "на", "но", "с", "со", "к", "ко", "по", "о", "об", "обо", "от", "до", "из", "за",
+    "для", "у", "под", "над", "при", "про", "через", "перед", "же", "ли", "бы", "это", "то",
+    "г", "гг", "год", "года", "году", "годы", "годах"
+))
+
+UNITS = {
+    "ноль": 0, "один": 1, "одна": 1, "одно": 1, "два": 2, "две": 2, "три": 3, "четыре": 4, "пять": 5,
+    "шесть": 6, "семь": 7, "восемь": 8, "девять": 9, "десять": 10, "одиннадцать": 11, "двенадцать": 12,
+    "тринадцать": 13, "четырнадцать": 14, "пятнадцать": 15, "шестнадцать": 16, "семнадцать": 17,
+    "восемнадцать": 18, "девятнадцать": 19, "двадцать": 20, "тридцать": 30, "сорок": 40, "пятьдесят": 50,
+    "шестьдесят": 60, "семьдесят": 70, "восемьдесят": 80, "девяносто": 90, "сто": 100, "двести": 200,
+    "триста": 300, "четыреста": 400, "пятьсот": 500, "шестьсот": 600, "семьсот": 700, "восемьсот": 800,
+    "девятьсот": 900
+}
+# Порядковые числительные во всех падежах: "в сорок первом", "сорок пятого года"
+ORDINAL_STEMS = {
+    "перв": 1, "втор": 2, "четверт": 4, "пят": 5, "шест": 6, "седьм": 7, "восьм": 8, "девят": 9,
+    "десят": 10, "двадцат": 20, "тридцат": 30, "сороков": 40, "пятидесят": 50, "шестидесят": 60,
+    "семидесят": 70, "восьмидесят": 80, "девяност": 90
+}
+ORDINAL_ENDINGS = ("ый", "ой", "ого", "ому", "ом", "ым", "ая", "ую", "ое", "ые", "ых")
+UNITS.update({stem + ending: value for stem, value in ORDINAL_STEMS.items() for ending in ORDINAL_ENDINGS})
+UNITS.update({word: 3 for word in ("третий", "третьего", "третьему", "третьем", "третьим", "третья", "третью", "третье")})
+THOUSANDS = frozenset(("тысяча", "тысячи", "тысяч"))
+
+# Одна таблица для str.translate: регистр снимается до, ё и пунктуация - здесь
+TRANSLATION = str.maketrans(
+    {"ё": "е", **{char: " " for char in "!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~«»—–…№"}}
+)
+
+
+def normalize(text: Optional[str]) -> tuple[str, ...]:
+    """Токены ответа: нижний регистр, ё→е, без пунктуации и служебных слов, числа словами → цифры"""
+    if not text:
+        return ()
+
+    tokens = []
+    number = None
+    for word in text.lower().translate(TRANSLATION).split():
+        if word in UNITS:
+            number = (number or 0) + UNITS[word]
+            continue
+        if word in THOUSANDS:
+            number = (number or 1) * 1000
+            continue
+        if number is not None:
+            tokens.append(str(number))
+            number = None
+        if word not in STOP_WORDS:
+            tokens.append(word)
+    if number is not None:
+        tokens.append(str(number))
+    return tuple(tokens)
+
+
+def similarity(first: str, second: str, cutoff: float = 0.0) -> float:
+    """1 - расстояние Левенштейна / длина большей строки; ниже cutoff считается сразу 0"""
+    if first == second:
+        return 1.0
+    if len(first) > len(second):
+        first, second = second, first
+    longest = len(second)
+    # Целочисленно: int(5 * (1 - 0.8)) дает 0 из-за 0.19999..., и пара ровно на пороге терялась
+    max_distance = longest * (100 - round(cutoff * 100)) // 100
+    if longest - len(first) > max_distance:
+        return 0.0
+
+    # Считаем только полосу шириной 2 * max_distance вокруг диагонали
+    overflow = max_distance + 1
+    previous = [j if j <= max_distance else overflow for j in range(longest + 1)]
+    for i, char in enumerate(first, start=1):
+        current = [overflow] * (longest + 1)
+        if i <= max_distance:
+            current[0] = i
+        row_min = current[0]
+        for j in range(max(1, i - max_distance), min(longest, i + max_distance) + 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != second[j - 1]))
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return 0.0
+        previous = current
+
+    distance = previous[-1]
+    return 1 - distance / longest if distance <= max_distance else 0.0
+
+
+class AnswerGrade:
+    __slots__ = ("username", "answer", "normalized", "score", "method", "correct")
+
+    def __init__(self, username: str, answer: str, normalized: str, score: float, method: str, threshold: float):
+        self.username = username
+        self.answer = answer
+        self.normalized = normalized
+        self.score = score
+        self.method = method
+        self.correct = score >= threshold
+
+    @property
+    def confidence(self) -> float:
+        return self.score if self.correct else 1 - self.score
+
+    def as_dict(self) -> dict:
+        return {
+            "username": self.username,
+            "answer": self.answer,
+            "normalized": self.normalized,
+            "correct": self.correct,
+            "confidence": round(self.confidence, 3),
+            "score": round(self.score, 3),
+            "method": self.method
+        }
+
+
+class AnswerGrader:
+    """
+    Проверка свободных ответов на русском по эталону текущего вопроса.
+
+    Эталон разбирается один раз (варианты через "/", ";", "или"), ответы
+    нормализуются и группируются: одинаковые после нормализации ответы
+    оцениваются один раз. Оценка - лучшая из трех: точное совпадение,
+    пересечение токенов с допуском опечаток и сходство строк целиком по
+    Левенштейну. Расстояние считается с отсечкой, а сходство пар токенов
+    кэшируется на весь проход, поэтому сотни ответов проверяются за
+    миллисекунды.
+    """
+
+    def __init__(self, threshold: float = ACCEPT_THRESHOLD, token_threshold: float = TOKEN_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self.token_threshold = token_threshold
+        self.graded = 0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+
+    def grade(self, reference: Optional[str], answers: Iterable[tuple[str, str]]) -> list[AnswerGrade]:
+        """Оценивает пары (username, ответ); правильные с наибольшей уверенностью идут первыми"""
+        start_time = time.perf_counter()
+        variants = [tokens for tokens in (normalize(variant) for variant in VARIANTS_PATTERN.split(reference or "")) if tokens]
+        token_cache: dict[tuple[str, str], float] = {}
+        scores: dict[tuple[str, ...], tuple[float, str]] = {}
+
+        grades = []
+        for username, answer in answers:
+            tokens = normalize(answer)
+            if tokens not in scores:
+                scores[tokens] = max(
+                    (self._score(variant, tokens, token_cache) for variant in variants),
+                    default=(0.0, "none")
+                )
+            score, method = scores[tokens]
+            grades.append(AnswerGrade(username, answer, " ".join(tokens), score, method, self.threshold))
+
+        grades.sort(key=lambda grade: (not grade.correct, -grade.score, grade.username))
+
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        self.graded += len(grades)
+        self.last_ms = elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        return grades
+
+    def _score(self, reference: tuple[str, ...], tokens: tuple[str, ...], token_cache: dict) -> tuple[float, str]:
+        if not tokens:
+            return 0.0, "none"
+        if tokens == reference:
+            return 1.0, "exact"
+
+        # Каждому слову эталона ищем самое похожее слово ответа (окончания и опечатки допускаются)
+        matched = 0.0
+        for expected in reference:
+            best = 0.0
+            for token in tokens:
+                key = (expected, token)
+                if key not in token_cache:
+                    # Числа (годы, даты) должны совпадать точно: 1944 - не опечатка в 1945
+                    if expected.isdigit() or token.isdigit():
+                        token_cache[key] = float(expected == token)
+                    else:
+                        token_cache[key] = similarity(expected, token, self.token_threshold)
+                best = max(best, token_cache[key])
+                if best == 1.0:
+                    break
+            matched += best
+        recall = matched / len(reference)
+        precision = min(matched / len(tokens), 1.0)
+        overlap = (1 + RECALL_WEIGHT) * precision * recall / (RECALL_WEIGHT * precision + recall) if matched else 0.0
+        if overlap >= self.threshold or any(expected.isdigit() and expected not in tokens for expected in reference):
+            return overlap, "tokens"
+
+        # Строка целиком ловит слитное или раздельное написание ("сталинградскаябитва")
+        edit = similarity(" ".join(reference), " ".join(tokens), self.threshold)
+        return (overlap, "tokens") if overlap >= edit else (edit, "edit")
+
+    def stats(self) -> dict:
+        return {
+            "threshold": self.threshold,
+            "graded": self.graded,
+            "last_ms": round(self.last_ms, 3),
+            "max_ms": round(self.max_ms, 3)
+        }
+
+
+answer_grader = AnswerGrader()
@@ -1,4 +1,9 @@
+from typing import AsyncIterator
+
+from sqlalchemy.engine import Row
+
 from repositories.answers.AnswerRepository import AnswerRepository
+from schemas.answers import AnswerFilterSchema
 
 
 class AnswerService:
@@ -6,20 +11,44 @@ class AnswerService:
     def __init__(self, repository: AnswerRepository):
         self.repository = repository
 
-    async def add_answer(self, question: str, username: str, answer: str):
-        return await self.repository.add_answer(question=question, username=username, answer=answer)
+    async def add_answer(
+        self,
+        question: str,
+        username: str,
+        answer: str,
+        received_us: int | None = None,
+        question_id: int | None = None,
+        game_id: int | None = None
+    ):
+        return await self.repository.add_answer(
+            question=question,
+            username=username,
+            answer=answer,
+            received_us=received_us,
+            question_id=question_id,
+            game_id=game_id
+        )
+    
+    async def add_answers(self, answers: list[dict]) -> int:
+        return await self.repository.add_answers(answers=answers)
     
     async def get_all_answers(self) -> list:
         return await self.repository.get_all_answers()
+
+    async def get_answers_page(self, filters: AnswerFilterSchema, after: int | None, limit: int) -> list:
+        return await self.repository.get_answers_page(filters=filters, after=after, limit=limit)
+
+    def stream_answers(self, filters: AnswerFilterSchema) -> AsyncIterator[list[Row]]:
+        return self.repository.stream_answers(filters=filters)
     
-    async def get_answers_by_question_id(self, question: str) -> list:
-        return await self.repository.get_answers_by_question_id(question=question)
+    async def get_answers_by_question_id(self, question_id: int, game_id: int | None = None) -> list:
+        return await self.repository.get_answers_by_question_id(question_id=question_id, game_id=game_id)
     
-    async def get_answers_by_user_id(self, username: str) -> list:
-        return await self.repository.get_answers_by_user_id(username=username)
+    async def get_answers_by_user_id(self, user_id: int, game_id: int | None = None) -> list:
+        return await self.repository.get_answers_by_user_id(user_id=user_id, game_id=game_id)
     
-    async def get_answers_by_question_and_user(self, question: str, username: str) -> list:
-        return await self.repository.get_answers_by_question_and_user(question=question, username=username)
+    async def get_answers_by_question_and_user(self, question_id: int, user_id: int, game_id: int | None = None) -> list:
+        return await self.repository.get_answers_by_question_and_user(question_id=question_id, user_id=user_id, game_id=game_id)
     
     async def reset_answers_table(self) -> dict:
         return await self.repository.reset_table()
@@ -0,0 +1,30 @@
+from typing import Optional
+
+from config import settings
+
+SPEED_BONUS_POINTS = settings.game.speed_bonus_points
+SPEED_BONUS_WINDOW = settings.game.speed_bonus_window
+
+
+def speed_bonus_scores(
+    received: dict[str, Optional[int]],
+    points: int,
+    bonus: int = SPEED_BONUS_POINTS,
+    window: int = SPEED_BONUS_WINDOW
+) -> dict[str, int]:
+    """
+    Очки за правильные ответы с бонусом за скорость за один проход.
+
+    received - время получения ответа в микросекундах от показа вопроса.
+    Бонус линейно убывает от bonus для мгновенного ответа до нуля к концу
+    окна window; ответ без времени получения получает только points.
+    """
+    window_us = window * 1_000_000
+    scores = {}
+    for username, received_us in received.items():
+        if received_us is None or window_us <= 0:
+            scores[username] = points
+            continue
+        left = max(window_us - max(received_us, 0), 0)
+        scores[username] = points + round(bonus * left / window_us)
+    return scores
@@ -41,6 +41,9 @@ class GameService:
     async def update_sections(self, sections: str):
         return await self.repository.update_sections(sections=sections)
     
+    async def patch_status(self, game_id: int | None = None, **fields):
+        return await self.repository.patch_status(game_id=game_id, **fields)
+    
     
     
 
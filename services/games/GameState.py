@@ -0,0 +1,267 @@
+import asyncio
+import json
+import time
+
+from typing import Awaitable, Callable, Optional
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from repositories import UnitOfWork
+from repositories.base.keyspace import GameKeyspace
+from repositories.games.GameRepository import DEFAULT_SECTIONS
+from services.games.GameService import GameService
+from config.logger import setup_logging
+
+logger = setup_logging()
+
+SECTIONS_SEPARATOR = "."
+PERSIST_RETRY_DELAY = 1
+
+# Общие для воркеров номер версии и поля снимка; в реестр ключей игры не входят,
+# чтобы очистка Redis не откатывала счетчик версий
+STATE_VERSION_KEY = "state:version"
+STATE_SNAPSHOT_KEY = "state:snapshot"
+
+# Значения полей gamestatus после остановки игры (как в GameRepository.stop_game)
+RESET_FIELDS = {
+    "sections": DEFAULT_SECTIONS.split(SECTIONS_SEPARATOR),
+    "current_section_index": 0,
+    "current_question": None,
+    "answer_for_current_question": None,
+    "current_question_image": None,
+    "current_answer_image": None,
+    "game_started": False,
+    "game_over": False,
+    "timer": False,
+    "show_answer": False,
+    "spectator_display_mode": "question"
+}
+
+# Поля снимка, которых нет в gamestatus: живут в памяти, в шине и в Redis
+TRANSIENT_FIELDS = {
+    "current_question_id": None
+}
+
+SNAPSHOT_FIELDS = {**RESET_FIELDS, **TRANSIENT_FIELDS}
+
+
+class GameSnapshot:
+    """Неизменяемый снимок состояния игры с номером версии"""
+
+    __slots__ = ("version", "id") + tuple(SNAPSHOT_FIELDS)
+
+    def __init__(self, version: int = 0, id: Optional[int] = None, **fields):
+        self.version = version
+        self.id = id
+        for field, default in SNAPSHOT_FIELDS.items():
+            setattr(self, field, fields.get(field, default))
+
+    @classmethod
+    def from_status(cls, status, version: int = 1) -> "GameSnapshot":
+        fields = {field: getattr(status, field) for field in RESET_FIELDS}
+        fields["sections"] = (status.sections or DEFAULT_SECTIONS).split(SECTIONS_SEPARATOR)
+        fields["current_section_index"] = status.current_section_index or 0
+        return cls(version=version, id=status.id, **fields)
+
+    def replace(self, version: int, game_id: Optional[int] = None, **changes) -> "GameSnapshot":
+        fields = {field: getattr(self, field) for field in SNAPSHOT_FIELDS}
+        fields.update(changes)
+        return GameSnapshot(version=version, id=self.id if game_id is None else game_id, **fields)
+
+    @property
+    def current_section(self) -> Optional[str]:
+        if 0 <= self.current_section_index < len(self.sections):
+            return self.sections[self.current_section_index]
+        return None
+
+    def as_dict(self) -> dict:
+        return {"version": self.version, "id": self.id, **{field: getattr(self, field) for field in SNAPSHOT_FIELDS}}
+
+
+class GameState:
+    """
+    Состояние игры, которым владеет процесс.
+
+    Админские действия меняют снимок в памяти и сразу получают новую версию,
+    а запись в gamestatus идет в фоне: накопленные изменения склеиваются и
+    сохраняются одним вызовом. Рассылки и новые подключения читают снимок
+    без запросов к БД. Изменения публикуются остальным воркерам через
+    on_change, а чужие изменения применяются через apply_remote.
+
+    Номер версии выдает общий счетчик в Redis (INCR в той же транзакции,
+    что записывает изменившиеся поля в хэш снимка), поэтому версии разных
+    воркеров сравнимы, а перезапущенный воркер поднимает снимок вместе с
+    текущим вопросом из Redis, а не только из gamestatus.
+    Момент показа вопроса запоминается по монотонным часам каждого воркера,
+    от него отсчитывается время получения ответов.
+    """
+
+    def __init__(self):
+        self.snapshot = GameSnapshot()
+        self.session_factory: Optional[async_sessionmaker] = None
+        self.keyspace: Optional[GameKeyspace] = None
+        self.on_change: Optional[Callable[[dict], Awaitable[None]]] = None
+        self.persisted_version = 0
+        self.question_shown_ns: Optional[int] = None
+        self._pending: dict = {}
+        self._dirty = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, session_factory: async_sessionmaker, redis: Optional[Redis] = None):
+        self.session_factory = session_factory
+        self.keyspace = GameKeyspace(redis) if redis is not None else None
+        await self.reload()
+        self._task = asyncio.create_task(self._persist_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def reload(self):
+        async with UnitOfWork(session_factory=self.session_factory) as uow:
+            status = await GameService(repository=uow.games).get_all_status()
+        if status is None:
+            self.persisted_version = self.snapshot.version
+            return
+
+        snapshot = GameSnapshot.from_status(status, version=self.snapshot.version)
+        version, stored = await self._load()
+        if stored.get("id") == status.id:
+            # Redis свежее gamestatus: запись в БД идет в фоне, а текущий вопрос есть только здесь
+            self.snapshot = snapshot
+            self._adopt(version, stored)
+        else:
+            fields = {field: getattr(snapshot, field) for field in SNAPSHOT_FIELDS}
+            version = await self._store(fields, game_id=status.id)
+            self.snapshot = snapshot.replace(version=version)
+            await self._publish({"version": version, "id": status.id, "changes": fields})
+        self.persisted_version = self.snapshot.version
+
+    async def update(self, **changes) -> GameSnapshot:
+        version = await self._store(changes)
+        self.snapshot = self.snapshot.replace(version=version, **changes)
+        self._mark_question_shown(changes)
+        persisted = {field: value for field, value in changes.items() if field in RESET_FIELDS}
+        if persisted:
+            self._pending.update(persisted)
+            self._dirty.set()
+        await self._publish({"version": self.snapshot.version, "changes": changes})
+        return self.snapshot
+
+    async def reset(self) -> GameSnapshot:
+        return await self.update(**SNAPSHOT_FIELDS)
+
+    def apply_remote(self, payload: dict):
+        changes = payload.get("changes")
+        if not changes or payload["version"] <= self.snapshot.version:
+            return
+        missed = payload["version"] > self.snapshot.version + 1
+        self.snapshot = self.snapshot.replace(version=payload["version"], game_id=payload.get("id"), **changes)
+        self._mark_question_shown(changes)
+        if missed and self.keyspace is not None:
+            # Пропущено чужое изменение (например, шина переподключалась): добираем снимок из Redis
+            asyncio.create_task(self.resync())
+
+    async def resync(self):
+        version, stored = await self._load()
+        if version >= self.snapshot.version and stored.get("id") == self.snapshot.id:
+            self._adopt(version, stored)
+
+    def _adopt(self, version: int, stored: dict):
+        fields = {field: value for field, value in stored.items() if field in SNAPSHOT_FIELDS}
+        self.snapshot = self.snapshot.replace(version=max(version, self.snapshot.version), **fields)
+
+    async def _store(self, changes: dict, game_id: Optional[int] = None) -> int:
+        """Записывает поля в общий снимок и возвращает новую версию из общего счетчика"""
+        if self.keyspace is None:
+            return self.snapshot.version + 1
+
+        mapping = {field: json.dumps(value, ensure_ascii=False) for field, value in changes.items()}
+        if game_id is not None:
+            mapping["id"] = json.dumps(game_id)
+        try:
+            async with self.keyspace.redis.pipeline(transaction=True) as pipe:
+                pipe.incr(self.keyspace.key(STATE_VERSION_KEY))
+                if mapping:
+                    pipe.hset(self.keyspace.key(STATE_SNAPSHOT_KEY), mapping=mapping)
+                results = await pipe.execute()
+            return results[0]
+        except Exception as e:
+            logger.error(f"Ошибка при записи состояния игры в Redis, версия выдана локально: {str(e)}")
+            return self.snapshot.version + 1
+
+    async def _load(self) -> tuple[int, dict]:
+        if self.keyspace is None:
+            return 0, {}
+        try:
+            async with self.keyspace.redis.pipeline(transaction=True) as pipe:
+                pipe.get(self.keyspace.key(STATE_VERSION_KEY))
+                pipe.hgetall(self.keyspace.key(STATE_SNAPSHOT_KEY))
+                version, stored = await pipe.execute()
+        except Exception as e:
+            logger.error(f"Ошибка при чтении состояния игры из Redis: {str(e)}")
+            return 0, {}
+        return int(version or 0), {field.decode("utf-8"): json.loads(value) for field, value in stored.items()}
+
+    def _mark_question_shown(self, changes: dict):
+        if "current_question_id" in changes:
+            self.question_shown_ns = time.monotonic_ns() if changes["current_question_id"] is not None else None
+
+    def elapsed_us(self, received_ns: int) -> Optional[int]:
+        """Микросекунды от показа текущего вопроса до received_ns (time.monotonic_ns())"""
+        if self.question_shown_ns is None:
+            return None
+        return (received_ns - self.question_shown_ns) // 1000
+
+    async def _publish(self, payload: dict):
+        if self.on_change is None:
+            return
+        try:
+            await self.on_change(payload)
+        except Exception as e:
+            logger.error(f"Ошибка при публикации состояния игры: {str(e)}")
+
+    async def _persist_loop(self):
+        while True:
+            await self._dirty.wait()
+            self._dirty.clear()
+            await self.flush()
+
+    async def flush(self):
+        changes, self._pending = self._pending, {}
+        if not changes:
+            return
+
+        version = self.snapshot.version
+        fields = dict(changes)
+        if "sections" in fields:
+            fields["sections"] = SECTIONS_SEPARATOR.join(fields["sections"])
+
+        try:
+            async with UnitOfWork(session_factory=self.session_factory) as uow:
+                await GameService(repository=uow.games).patch_status(game_id=self.snapshot.id, **fields)
+        except asyncio.CancelledError:
+            self._pending = {**changes, **self._pending}
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении состояния игры, повтор через {PERSIST_RETRY_DELAY} с: {str(e)}")
+            self._pending = {**changes, **self._pending}
+            await asyncio.sleep(PERSIST_RETRY_DELAY)
+            self._dirty.set()
+            return
+
+        self.persisted_version = version
+
+    def stats(self) -> dict:
+        return {
+            "version": self.snapshot.version,
+            "persisted_version": self.persisted_version,
+            "pending_fields": list(self._pending)
+        }
+
+
+game_state = GameState()
@@ -0,0 +1,144 @@
+import asyncio
+import math
+import time
+
+from typing import Awaitable, Callable, Optional
+
+from config import settings
+from config.logger import setup_logging
+
+logger = setup_logging()
+
+TIMER_DURATION = settings.game.timer_duration
+TICK_INTERVAL = 1
+REJECT_LATE_ANSWERS = True
+
+
+class GameTimer:
+    """
+    Серверный таймер вопроса.
+
+    Дедлайн хранится по монотонным часам процесса, а события start/tick/expired
+    рассылает одна задача-планировщик на воркере, где таймер запущен. Тики
+    выравниваются по дедлайну, поэтому не накапливают задержку. Остальные
+    воркеры получают через on_change оставшееся время и пересчитывают дедлайн
+    по своим часам, так что отсечка поздних ответов работает везде без БД.
+    Дедлайн сбрасывается только при смене вопроса (cancel).
+    """
+
+    def __init__(self, tick_interval: float = TICK_INTERVAL, reject_late: bool = REJECT_LATE_ANSWERS):
+        self.tick_interval = tick_interval
+        self.reject_late = reject_late
+        self.duration: Optional[int] = None
+        self.deadline: Optional[float] = None
+        self.on_change: Optional[Callable[[dict], Awaitable[None]]] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.started = 0
+        self.expired = 0
+        self.late_answers = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def remaining(self) -> Optional[int]:
+        if self.deadline is None:
+            return None
+        return max(math.ceil(self.deadline - time.monotonic()), 0)
+
+    def is_late(self) -> bool:
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def register_late_answer(self) -> bool:
+        """Учитывает поздний ответ; True - ответ нужно отклонить"""
+        self.late_answers += 1
+        return self.reject_late
+
+    async def start(
+        self,
+        duration: int,
+        on_event: Callable[[str, int], Awaitable[None]],
+        on_expire: Optional[Callable[[], Awaitable[None]]] = None
+    ):
+        self._cancel_task()
+        self.duration = duration
+        self.deadline = time.monotonic() + duration
+        self.started += 1
+        self._task = asyncio.create_task(self._run(on_event, on_expire))
+        await self._publish({"timer": {"duration": duration, "remaining": duration}})
+
+    async def stop(self):
+        """Останавливает планировщик при выключении воркера, не сбрасывая таймер у остальных"""
+        task = self._task
+        self._cancel_task()
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def cancel(self):
+        had_deadline = self.deadline is not None
+        self._cancel_task()
+        self.deadline = None
+        self.duration = None
+        if had_deadline:
+            await self._publish({"timer": None})
+
+    def apply_remote(self, payload: dict):
+        if "timer" not in payload:
+            return
+        self._cancel_task()
+        timer = payload["timer"]
+        if timer is None:
+            self.deadline = None
+            self.duration = None
+        else:
+            self.duration = timer["duration"]
+            self.deadline = time.monotonic() + timer["remaining"]
+
+    def _cancel_task(self):
+        if self._task is not None and not self._task.done() and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._task = None
+
+    async def _run(self, on_event, on_expire):
+        try:
+            await on_event("start", self.duration)
+            while True:
+                remaining = self.deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                # Спим до ближайшей целой отметки относительно дедлайна
+                await asyncio.sleep(remaining - (math.ceil(remaining / self.tick_interval) - 1) * self.tick_interval)
+                left = self.remaining()
+                if left > 0:
+                    await on_event("tick", left)
+
+            self.expired += 1
+            logger.info(f"⏰ Время на ответ истекло ({self.duration} с)")
+            await on_event("expired", 0)
+            if on_expire is not None:
+                await on_expire()
+        except Exception as e:
+            logger.error(f"Ошибка в таймере вопроса: {str(e)}")
+
+    async def _publish(self, payload: dict):
+        if self.on_change is None:
+            return
+        try:
+            await self.on_change(payload)
+        except Exception as e:
+            logger.error(f"Ошибка при публикации таймера: {str(e)}")
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "duration": self.duration,
+            "remaining": self.remaining(),
+            "started": self.started,
+            "expired": self.expired,
+            "late_answers": self.late_answers,
+            "reject_late": self.reject_late
+        }
+
+
+game_timer = GameTimer()
@@ -0,0 +1,126 @@
+import asyncio
+
+from typing import Awaitable, Optional
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from repositories import UnitOfWork
+from schemas.questions import QuestionSchema
+from services.questions.QuestionService import QuestionService
+from config.logger import setup_logging
+
+logger = setup_logging()
+
+
+class QuestionPrefetcher:
+    """
+    Следующий вопрос текущего раздела, подготовленный заранее.
+
+    Пока на экране текущий вопрос, фоновая задача атомарно переносит
+    голову колоды в список подготовленного вопроса раздела (общий для
+    всех воркеров) и держит разобранную копию в памяти. /admin/next
+    забирает подготовленный вопрос одной командой LMOVE в список
+    показанных, не трогая колоду и не разбирая JSON. Если забрать
+    удалось другой вопрос (свой подготовленный успел показать другой
+    воркер), показывается тот, что реально извлечен, поэтому вопросы
+    не повторяются. Если колоду меняли в обход (перезагрузка, возврат,
+    перезапуск раздела), копия в памяти сбрасывается через invalidate().
+    """
+
+    def __init__(self):
+        self.session_factory: Optional[async_sessionmaker] = None
+        self.redis: Optional[Redis] = None
+        self.section: Optional[str] = None
+        self.staged: Optional[QuestionSchema] = None
+        self.staged_json: Optional[bytes] = None
+        self.ready = False
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, session_factory: async_sessionmaker, redis: Redis):
+        self.session_factory = session_factory
+        self.redis = redis
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.invalidate()
+
+    def invalidate(self):
+        self.generation += 1
+        self.ready = False
+        self.staged = None
+        self.staged_json = None
+
+    def stage(self, section: str):
+        self._schedule(self._reserve(section, self.generation))
+
+    async def take(self, section: str) -> Optional[QuestionSchema]:
+        """Следующий вопрос раздела; None - колода раздела закончилась"""
+        prepared = self.ready and self.section == section
+        staged, staged_json = (self.staged, self.staged_json) if prepared else (None, None)
+        self.invalidate()
+
+        async with self._unit_of_work() as uow:
+            service = QuestionService(repository=uow.questions)
+            claimed = await service.claim_question(section) if staged_json is not None else None
+            if claimed is None:
+                # Подготовленного нет или его уже показали - берем из колоды
+                question = await service.pop_question(section)
+                hit = prepared and staged_json is None and question is None
+            elif claimed == staged_json:
+                question = staged
+                hit = True
+            else:
+                question = QuestionSchema.model_validate_json(claimed)
+                hit = False
+
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self.stage(section)
+        return question
+
+    def _unit_of_work(self) -> UnitOfWork:
+        return UnitOfWork(session_factory=self.session_factory, redis=self.redis)
+
+    def _schedule(self, job: Awaitable[None]):
+        previous = self._task
+
+        async def run():
+            if previous is not None:
+                await asyncio.gather(previous, return_exceptions=True)
+            try:
+                await job
+            except Exception as e:
+                logger.error(f"Ошибка при подготовке следующего вопроса: {str(e)}")
+
+        self._task = asyncio.create_task(run())
+
+    async def _reserve(self, section: str, generation: int):
+        async with self._unit_of_work() as uow:
+            staged_json = await QuestionService(repository=uow.questions).reserve_question(section)
+        if generation != self.generation:
+            return
+        self.section = section
+        self.staged_json = staged_json
+        self.staged = QuestionSchema.model_validate_json(staged_json) if staged_json is not None else None
+        self.ready = True
+
+    def stats(self) -> dict:
+        return {
+            "section": self.section,
+            "ready": self.ready,
+            "staged_id": self.staged.id if self.staged else None,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+question_prefetcher = QuestionPrefetcher()
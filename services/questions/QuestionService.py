@@ -26,17 +26,41 @@ class QuestionService:
     async def reset_question_table(self):
         return await self.repository.reset_table()
     
-    async def load_questions_to_redis(self, section: str):
-        return await self.repository.load_questions_to_redis(section=section)
+    async def load_questions_to_redis(self, section: str, seed: int | None = None):
+        return await self.repository.load_questions_to_redis(section=section, seed=seed)
     
-    async def get_random_question(self, section: str):
-        return await self.repository.get_random_question(section=section)
+    async def load_decks(self, sections: list[str], seed: int | None = None):
+        return await self.repository.load_decks(sections=sections, seed=seed)
+    
+    async def pop_question(self, section: str):
+        return await self.repository.pop_question(section=section)
+    
+    async def reserve_question(self, section: str):
+        return await self.repository.reserve_question(section=section)
+    
+    async def claim_question(self, section: str):
+        return await self.repository.claim_question(section=section)
+    
+    async def peek_questions(self, section: str, count: int):
+        return await self.repository.peek_questions(section=section, count=count)
+    
+    async def return_question(self, section: str):
+        return await self.repository.return_question(section=section)
+    
+    async def restart_section(self, section: str):
+        return await self.repository.restart_section(section=section)
     
     async def has_questions(self, section: str):
         return await self.repository.has_questions(section=section)
     
-    async def clear_questions(self, section: str):
-        return await self.repository.clear_questions(section=section)
+    async def missing_sections(self, sections: list[str]):
+        return await self.repository.missing_sections(sections=sections)
+    
+    async def deck_stats(self, sections: list[str]):
+        return await self.repository.deck_stats(sections=sections)
+    
+    async def clear_questions(self, *sections: str):
+        return await self.repository.clear_questions(*sections)
     
     async def clear_redis(self):
         return await self.repository.clear_redis()
@@ -0,0 +1,230 @@
+import json
+
+from typing import Awaitable, Callable, Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+
+from repositories.base.keyspace import GameKeyspace
+from repositories.users.exceptions.exceptions import UsersNotFoundException
+from services.users.UserService import UserService
+from config.logger import setup_logging
+
+logger = setup_logging()
+
+RATING_TOP_N = 100
+
+LEADERBOARD_KEY = "leaderboard"
+LEADERBOARD_IDS_KEY = "leaderboard:ids"
+LEADERBOARD_READY_KEY = "leaderboard:ready"
+LEADERBOARD_PUBLISHED_KEY = "leaderboard:published"
+
+FULL = "full"
+DELTA = "delta"
+
+
+class RatingUpdate:
+    """Опубликованная версия рейтинга и ее отличия от предыдущей"""
+
+    __slots__ = ("version", "base", "players", "changes", "removed")
+
+    def __init__(self, version: int, base: int, players: list[dict], changes: list[dict], removed: list[str]):
+        self.version = version
+        self.base = base
+        self.players = players
+        self.changes = changes
+        self.removed = removed
+
+
+class Leaderboard:
+    """
+    Рейтинг команд в Redis ZSET, Postgres остается надежной копией очков.
+
+    Каждое изменение очков после коммита в БД применяется через ZINCRBY,
+    а рейтинг читается как top-N из ZSET за O(log n + N) без скана users.
+    Если ZSET еще не построен или сброшен (регистрация, удаление, очистка
+    Redis), он один раз собирается из БД при следующем чтении.
+
+    Показанный зрителям рейтинг хранится в Redis с номером версии, общим
+    для всех воркеров. publish() сравнивает свежий top-N с последней
+    опубликованной версией, так что зрителям можно отправить только
+    изменившиеся строки, а полный снимок - при подключении или по запросу.
+    Номер версии расходится по воркерам через on_change / apply_remote.
+    """
+
+    def __init__(self, limit: int = RATING_TOP_N):
+        self.limit = limit
+        self.keyspace: Optional[GameKeyspace] = None
+        self.version = 0
+        self.on_change: Optional[Callable[[dict], Awaitable[None]]] = None
+        self.rebuilds = 0
+        self.frames = {mode: {"count": 0, "bytes": 0, "last_bytes": 0, "encode_ms": 0.0, "max_encode_ms": 0.0} for mode in (FULL, DELTA)}
+
+    def start(self, redis: Redis):
+        self.keyspace = GameKeyspace(redis)
+
+    @property
+    def redis(self) -> Redis:
+        return self.keyspace.redis
+
+    async def add_score(self, username: str, points: int):
+        try:
+            await self.redis.zincrby(self.keyspace.key(LEADERBOARD_KEY), points, username)
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении рейтинга для {username}, рейтинг будет пересобран: {str(e)}")
+            await self.invalidate()
+
+    async def add_scores(self, scores: dict[str, int]):
+        board = self.keyspace.key(LEADERBOARD_KEY)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                for username, points in scores.items():
+                    pipe.zincrby(board, points, username)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении рейтинга, рейтинг будет пересобран: {str(e)}")
+            await self.invalidate()
+
+    async def invalidate(self):
+        try:
+            await self.redis.unlink(self.keyspace.key(LEADERBOARD_READY_KEY))
+        except Exception as e:
+            logger.error(f"Ошибка при сбросе рейтинга: {str(e)}")
+
+    async def rebuild(self, service_user: UserService):
+        try:
+            users = await service_user.get_all_user()
+        except UsersNotFoundException:
+            # Команд еще нет - это пустой рейтинг, а не сбой БД
+            users = []
+
+        board = self.keyspace.key(LEADERBOARD_KEY)
+        ids = self.keyspace.key(LEADERBOARD_IDS_KEY)
+        ready = self.keyspace.key(LEADERBOARD_READY_KEY)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(board, ids)
+            if users:
+                pipe.zadd(board, {user["username"]: user["score"] or 0 for user in users})
+                pipe.hset(ids, mapping={user["username"]: user["id"] for user in users})
+            pipe.set(ready, 1)
+            self.keyspace.track(pipe, board, ids, ready)
+            await pipe.execute()
+
+        self.rebuilds += 1
+        logger.info(f"🏆 Рейтинг пересобран из БД: {len(users)} команд")
+
+    async def top(self, service_user: UserService, limit: Optional[int] = None) -> list[dict]:
+        limit = limit or self.limit
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.exists(self.keyspace.key(LEADERBOARD_READY_KEY))
+            pipe.zrevrange(self.keyspace.key(LEADERBOARD_KEY), 0, limit - 1, withscores=True)
+            ready, entries = await pipe.execute()
+
+        if not ready:
+            await self.rebuild(service_user)
+            entries = await self.redis.zrevrange(self.keyspace.key(LEADERBOARD_KEY), 0, limit - 1, withscores=True)
+
+        usernames = [member.decode("utf-8") for member, _ in entries]
+        ids = await self.redis.hmget(self.keyspace.key(LEADERBOARD_IDS_KEY), usernames) if usernames else []
+
+        return [
+            {
+                "id": int(user_id) if user_id is not None else None,
+                "username": username,
+                "score": int(score),
+                "rank": rank
+            }
+            for rank, (username, (_, score), user_id) in enumerate(zip(usernames, entries, ids), start=1)
+        ]
+
+    async def publish(self, service_user: UserService) -> RatingUpdate:
+        """Публикует свежий top-N новой версией и возвращает отличия от предыдущей"""
+        key = self.keyspace.key(LEADERBOARD_PUBLISHED_KEY)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                players = await self.top(service_user)
+                try:
+                    await pipe.watch(key)
+                    published = await pipe.get(key)
+                    base, previous = self._decode(published)
+
+                    previous_by_name = {player["username"]: player for player in previous}
+                    changes = []
+                    for player in players:
+                        before = previous_by_name.pop(player["username"], None)
+                        player["rank_change"] = before["rank"] - player["rank"] if before else 0
+                        if before is None or before["score"] != player["score"] or before["rank"] != player["rank"]:
+                            changes.append(player)
+
+                    if base and not changes and not previous_by_name:
+                        await pipe.unwatch()
+                        self.version = base
+                        return RatingUpdate(base, base, players, [], [])
+
+                    version = base + 1
+                    pipe.multi()
+                    pipe.set(key, json.dumps({"version": version, "players": players}, separators=(",", ":"), ensure_ascii=False))
+                    self.keyspace.track(pipe, key)
+                    await pipe.execute()
+                except WatchError:
+                    # Рейтинг параллельно опубликовал другой воркер: считаем отличия заново
+                    continue
+
+                self.version = version
+                await self._publish({"rating_version": version})
+                return RatingUpdate(version, base, players, changes, list(previous_by_name))
+
+    async def snapshot(self, service_user: UserService) -> RatingUpdate:
+        """Последняя опубликованная версия рейтинга целиком"""
+        version, players = self._decode(await self.redis.get(self.keyspace.key(LEADERBOARD_PUBLISHED_KEY)))
+        if not version:
+            return await self.publish(service_user)
+        self.version = version
+        return RatingUpdate(version, version, players, players, [])
+
+    def apply_remote(self, payload: dict):
+        if "rating_version" in payload:
+            self.version = payload["rating_version"]
+
+    async def _publish(self, payload: dict):
+        if self.on_change is None:
+            return
+        try:
+            await self.on_change(payload)
+        except Exception as e:
+            logger.error(f"Ошибка при публикации версии рейтинга: {str(e)}")
+
+    @staticmethod
+    def _decode(published: Optional[bytes]) -> tuple[int, list[dict]]:
+        if published is None:
+            return 0, []
+        data = json.loads(published)
+        return data["version"], data["players"]
+
+    def record_frame(self, mode: str, size: int, encode_ms: float):
+        frames = self.frames[mode]
+        frames["count"] += 1
+        frames["bytes"] += size
+        frames["last_bytes"] = size
+        frames["encode_ms"] += encode_ms
+        frames["max_encode_ms"] = max(frames["max_encode_ms"], encode_ms)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "version": self.version,
+            "rebuilds": self.rebuilds,
+            "frames": {
+                mode: {
+                    "count": frames["count"],
+                    "avg_bytes": frames["bytes"] // frames["count"] if frames["count"] else 0,
+                    "last_bytes": frames["last_bytes"],
+                    "avg_encode_ms": round(frames["encode_ms"] / frames["count"], 3) if frames["count"] else 0.0,
+                    "max_encode_ms": round(frames["max_encode_ms"], 3)
+                }
+                for mode, frames in self.frames.items()
+            }
+        }
+
+
+leaderboard = Leaderboard()
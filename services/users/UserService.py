@@ -60,6 +60,9 @@ class UserService:
     
     async def add_score_to_user(self, username: str, points: int):
         return await self.repository.add_score_to_user(username=username, points=points)
+
+    async def add_scores_to_users(self, scores: dict[str, int]) -> list[dict]:
+        return await self.repository.add_scores_to_users(scores=scores)
     
     async def delete_user_by_username(self, username: str) -> dict:
         return await self.repository.delete_user_by_username(username=username)
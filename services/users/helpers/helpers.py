@@ -1,6 +1,6 @@
 from config.utils.auth import utils
 from schemas.users import UserSchema
-from config import settings, DatabaseConnection
+from config import settings
 from pydantic import BaseModel
 from ..exceptions.exceptions import TokenTypeException, InvalidTokenException
 
@@ -66,11 +66,3 @@ async def get_current_auth_user_for_refresh(payload: dict) -> str:
         raise TokenTypeException(token_type=REFRESH_TYPE)
     
     return username
-    
-
-db = DatabaseConnection(
-    db_url=settings.db.url,
-    echo_pool=settings.db.echo_pool,
-    pool_size=settings.db.pool_size,
-    db_echo=settings.db.echo
-)
\ No newline at end of file